@@ -4,6 +4,8 @@ from discord.ext import commands
 import os
 import json
 import db
+import http_client
+from resolver import NameResolver, ResolverEvents
 from dotenv import load_dotenv
 import sys
 
@@ -19,7 +21,17 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+class ReverbBot(commands.Bot):
+    async def close(self):
+        try:
+            await super().close()
+        finally:
+            # Pooled HTTP sessions outlive every cog, close them last
+            await http_client.clients.close()
+
+
+bot = ReverbBot(command_prefix='!', intents=intents)
+bot.resolver = NameResolver()  # shared channel/role name -> id cache used by every cog
 
 
 @bot.event
@@ -33,12 +45,20 @@ async def on_ready():
 
     try:
         for filename in os.listdir("./cogs"):
-            if filename.endswith(".py") and filename != "lottery_task.py" and filename != "gold_gamba.py" and filename != "trial_management.py" and filename != "raid_updater.py" and filename != "raid_updater_weekly.py" and filename != "upgrade_sheet_sync.py":
+            if filename.endswith(".py") and filename != "lottery_task.py" and filename != "gold_gamba.py" and filename != "trial_management.py" and filename != "raid_updater.py" and filename != "raid_updater_weekly.py" and filename != "upgrade_sheet_sync.py" and filename != "wowaudit_sims.py" and filename != "character_info.py":
                 await bot.load_extension(f"cogs.{filename[:-3]}")
     except Exception as l:
         print(f'RYAN EXCEPTON NO FILE: {l}')
         sys.stdout.flush()
 
+    try:
+        await bot.add_cog(ResolverEvents(bot, bot.resolver))
+        print("Loaded ResolverEvents cog.")
+        sys.stdout.flush()
+    except Exception as e:
+        print(f"Error loading ResolverEvents cog: {e}")
+        sys.stdout.flush()
+
     try:
         from cogs.trial_management import TrialManagement
         await bot.add_cog(TrialManagement(bot, database))
@@ -66,6 +86,24 @@ async def on_ready():
         print(f"Error loading UpgradeSheetSync cog: {e}")
         sys.stdout.flush()
 
+    try:
+        from cogs.character_info import CharacterInfo
+        await bot.add_cog(CharacterInfo(bot, database))
+        print("Loaded CharacterInfo cog with database.")
+        sys.stdout.flush()
+    except Exception as e:
+        print(f"Error loading CharacterInfo cog: {e}")
+        sys.stdout.flush()
+
+    try:
+        from cogs.wowaudit_sims import WowAuditSims
+        await bot.add_cog(WowAuditSims(bot, database))
+        print("Loaded WowAuditSims cog with database.")
+        sys.stdout.flush()
+    except Exception as e:
+        print(f"Error loading WowAuditSims cog: {e}")
+        sys.stdout.flush()
+
     try:
         from cogs.gold_gamba import GoldGamba
         await bot.add_cog(GoldGamba(bot, database))
@@ -1,22 +1,171 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
+import os
 import json
 import asyncio
-import requests
+import bisect
+import http_client
+from raiderio_cache import ProfileCache, realm_slug
 
 
-RAIDERIO_BASE_URL_API = 'https://raider.io/api/v1/characters/profile'
+PROFILE_FIELDS = 'raid_progression:current-expansion,mythic_plus_scores_by_season:current'
 RAIDERIO_CHAR_PROFILE_URL = 'https://raider.io/characters/us/'
 WARCRAFT_LOGS_URL = 'https://www.warcraftlogs.com/character/us/'
 RECRUIT_FINDS_CHANNEL = '1308802260129677404'
+WOW_AUDIT_TOKEN = os.getenv('WOW_AUDIT_TOKEN')
+WOW_AUDIT_CHARACTERS_URL = 'https://wowaudit.com/v1/characters'
+
+ROSTER_LOOKUP_CONCURRENCY = int(os.getenv("ROSTER_LOOKUP_CONCURRENCY", "8"))  # Raider.io requests in flight
+ROSTER_PAGE_SIZE = 15
+DIFFICULTY_RANK = {'N': 1, 'H': 2, 'M': 3}
+AUTOCOMPLETE_REFRESH_MINUTES = int(os.getenv("AUTOCOMPLETE_REFRESH_MINUTES", "30"))
+AUTOCOMPLETE_LIMIT = 25  # Discord's maximum number of choices
+
+headers = {
+    'Authorization': f'Bearer {WOW_AUDIT_TOKEN}',
+    'Accept': 'application/json'
+}
+
+
+def progression_key(summary: str):
+    """Turn a Raider.io summary like '6/8 M' into a sortable (difficulty, kills) tuple."""
+    try:
+        kills, difficulty = summary.split(' ')
+        return DIFFICULTY_RANK.get(difficulty, 0), int(kills.split('/')[0])
+    except ValueError:
+        return 0, 0
+
+
+class PrefixIndex:
+    """Sorted (lowercase key, value) pairs; prefix lookups are a bisect plus a short scan."""
+
+    def __init__(self, pairs=()):
+        self.entries = sorted(set((key.lower(), value) for key, value in pairs))
+        self.keys = [key for key, _ in self.entries]
+
+    def search(self, prefix: str, limit: int = AUTOCOMPLETE_LIMIT, predicate=None) -> list:
+        prefix = prefix.lower()
+        results = []
+        start = bisect.bisect_left(self.keys, prefix)
+        for key, value in self.entries[start:]:
+            if not key.startswith(prefix):
+                break
+            if predicate is None or predicate(value):
+                results.append(value)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+class RosterInfoView(discord.ui.View):
+    """Compact roster table with paging, owned by whoever ran the command."""
+
+    def __init__(self, user_id: int, title: str, rows: list, missing: list):
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        self.title = title
+        self.rows = rows
+        self.missing = missing
+        self.page = 0
+        self.pages = max(1, (len(rows) + ROSTER_PAGE_SIZE - 1) // ROSTER_PAGE_SIZE)
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+
+    def build_embed(self) -> discord.Embed:
+        start = self.page * ROSTER_PAGE_SIZE
+        lines = [f"{'#':>2} {'Name':<12} {'Spec':<24} {'Score':>6} {'Prog':>6}"]
+        for index, row in enumerate(self.rows[start:start + ROSTER_PAGE_SIZE], start=start + 1):
+            lines.append(f"{index:>2} {row['name'][:12]:<12} {row['spec'][:24]:<24} {row['score']:>6.0f} {row['progression']:>6}")
+
+        embed = discord.Embed(title=self.title, description="```\n" + "\n".join(lines) + "\n```", color=discord.Color.blue())
+        if self.missing:
+            embed.add_field(name="Not found on Raider.io", value=", ".join(self.missing)[:1024], inline=False)
+        embed.set_footer(text=f"Page {self.page + 1}/{self.pages} - {len(self.rows)} characters")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("This roster view belongs to someone else.", ephemeral=True)
+            return False
+        return True
+
+    async def show_page(self, interaction: discord.Interaction, page: int):
+        self.page = page
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page + 1)
+
 
 class CharacterInfo(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, database):
         self.bot = bot
+        self.db = database
+        self.profiles = ProfileCache(database)
+        self.realm_index = PrefixIndex()
+        self.character_index = PrefixIndex()  # values are (name, realm_slug)
+
+    async def cog_load(self):
+        pruned = await self.profiles.prune()
+        if pruned:
+            print(f"[Raider.io] Pruned {pruned} expired cached profiles")
+        self.refresh_autocomplete.start()
+
+    def cog_unload(self):
+        self.refresh_autocomplete.cancel()
+
+    # ----------------------
+    # Autocomplete index, rebuilt from the WowAudit roster and cached profiles
+    # ----------------------
+    @tasks.loop(minutes=AUTOCOMPLETE_REFRESH_MINUTES)
+    async def refresh_autocomplete(self):
+        characters = set()
+        try:
+            roster = await self.fetch_roster()
+        except Exception as e:
+            print(f"[Autocomplete] Failed to fetch WowAudit roster: {e}")
+            roster = None
+        for name, realm in roster or []:
+            characters.add((name, realm_slug(realm)))
+
+        for cache_key in await self.db.get_raiderio_profile_keys():
+            region, realm, name, _ = cache_key.split(':', 3)
+            if region == 'us':
+                characters.add((name.capitalize(), realm))
+
+        # Build the new indexes before swapping, lookups never see a half-built one
+        self.realm_index = PrefixIndex((realm, realm) for _, realm in characters)
+        self.character_index = PrefixIndex((name, (name, realm)) for name, realm in characters)
+        print(f"[Autocomplete] Indexed {len(characters)} characters on {len(self.realm_index.entries)} realms")
+
+    async def realm_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=realm, value=realm)
+            for realm in self.realm_index.search(realm_slug(current))
+        ]
+
+    async def character_autocomplete(self, interaction: discord.Interaction, current: str):
+        realm = getattr(interaction.namespace, 'realm', None)
+        realm = realm_slug(realm) if realm else None
+        predicate = (lambda value: value[1] == realm) if realm else None
+        return [
+            app_commands.Choice(name=f"{name} - {char_realm}", value=name)
+            for name, char_realm in self.character_index.search(current.strip(), predicate=predicate)
+        ]
 
     @app_commands.command(name="characterinfo", description="Fetch character info and links")
     @app_commands.describe(character_name="The character name", realm="The realm of the character")
+    @app_commands.autocomplete(character_name=character_autocomplete, realm=realm_autocomplete)
     async def characterinfo(self, interaction: discord.Interaction, character_name: str, realm: str):
 
         await interaction.response.defer()
@@ -24,20 +173,13 @@ class CharacterInfo(commands.Cog):
         msg_string = ''
         raiderio_page = RAIDERIO_CHAR_PROFILE_URL + realm + '/' + character_name
         warcraftlogs_page = WARCRAFT_LOGS_URL + realm + '/' + character_name
-        params = {
-            'region': 'us',
-            'realm': realm.replace(' ', '-').lower(),
-            'name': character_name,
-            'fields': 'raid_progression:current-expansion,mythic_plus_scores_by_season:current'
-        }
 
-        response = requests.get(RAIDERIO_BASE_URL_API, params=params)
+        data = await self.profiles.get(realm, character_name, PROFILE_FIELDS)
 
-        if response.status_code != 200:
+        if data is None:
             await interaction.followup.send("Character not found on Raider.io, check name and realm")
             return
         
-        data = response.json()
         score_data = data["mythic_plus_scores_by_season"][0]["segments"]["all"]
 
         embed = discord.Embed(
@@ -67,6 +209,93 @@ class CharacterInfo(commands.Cog):
         
 
         await interaction.followup.send(embed=embed)
+
+    # ----------------------
+    # Bulk roster lookup
+    # ----------------------
+    async def fetch_roster(self):
+        """Return [(name, realm)] for the WowAudit roster, or None if WowAudit can't be reached."""
+        response = await http_client.request("wowaudit", "GET", WOW_AUDIT_CHARACTERS_URL, headers=headers)
+        if response.status != 200 or response.data is None:
+            print(f"Failed to fetch WowAudit roster: {response.status}")
+            return None
+        return [(char["name"], char["realm"]) for char in response.data]
+
+    async def lookup_many(self, characters: list):
+        """Fetch every profile concurrently, at most ROSTER_LOOKUP_CONCURRENCY at a time."""
+        limiter = asyncio.Semaphore(ROSTER_LOOKUP_CONCURRENCY)
+
+        async def lookup(name, realm):
+            async with limiter:
+                return await self.profiles.get(realm, name, PROFILE_FIELDS)
+
+        return await asyncio.gather(*[lookup(name, realm) for name, realm in characters])
+
+    @app_commands.command(name="rosterinfo", description="Raider.io score and progression for a list of characters or the WowAudit roster")
+    @app_commands.describe(
+        names="Comma separated Name-Realm entries (leave empty to use the WowAudit roster)",
+        realm="Realm for entries given without one",
+        sort_by="Order of the table"
+    )
+    @app_commands.choices(sort_by=[
+        app_commands.Choice(name="Raider.io score", value="score"),
+        app_commands.Choice(name="Raid progression", value="progression"),
+    ])
+    async def rosterinfo(self, interaction: discord.Interaction, names: str = None, realm: str = None, sort_by: str = "score"):
+        await interaction.response.defer()
+
+        if names:
+            characters = []
+            for entry in names.split(','):
+                entry = entry.strip()
+                if not entry:
+                    continue
+                # Character names never contain '-', realm slugs can
+                name, _, entry_realm = entry.partition('-')
+                characters.append((name, entry_realm or realm))
+            without_realm = [name for name, char_realm in characters if not char_realm]
+            if without_realm:
+                await interaction.followup.send(f"No realm given for: {', '.join(without_realm)}. Use Name-Realm or set `realm`.")
+                return
+            title = "Character lookup"
+        else:
+            characters = await self.fetch_roster()
+            if characters is None:
+                await interaction.followup.send("Failed to fetch the roster from WowAudit.")
+                return
+            title = "WowAudit roster"
+
+        if not characters:
+            await interaction.followup.send("No characters to look up.")
+            return
+
+        profiles = await self.lookup_many(characters)
+
+        rows = []
+        missing = []
+        for (name, char_realm), data in zip(characters, profiles):
+            if data is None:
+                missing.append(f"{name}-{char_realm}")
+                continue
+            # Raider.io lists the newest raid of the expansion first
+            raids = list(data.get("raid_progression", {}).values())
+            summary = raids[0]["summary"] if raids else "-"
+            seasons = data.get("mythic_plus_scores_by_season") or [{}]
+            rows.append({
+                "name": data["name"],
+                "spec": f"{data.get('active_spec_name', '')} {data['class']}",
+                "score": seasons[0].get("segments", {}).get("all", {}).get("score", 0),
+                "progression": summary,
+                "progression_key": progression_key(summary),
+            })
+
+        if sort_by == "progression":
+            rows.sort(key=lambda row: (row["progression_key"], row["score"]), reverse=True)
+        else:
+            rows.sort(key=lambda row: row["score"], reverse=True)
+
+        view = RosterInfoView(interaction.user.id, f"{title} - sorted by {sort_by}", rows, missing)
+        await interaction.followup.send(embed=view.build_embed(), view=view)
         
 """         raid_prog_string = ''
         score_data = data["mythic_plus_scores_by_season"][0]["segments"]["all"]
@@ -87,7 +316,8 @@ class CharacterInfo(commands.Cog):
  """
 
 
+
         
         
-async def setup(bot):
-    await bot.add_cog(CharacterInfo(bot))
\ No newline at end of file
+async def setup(bot, database):
+    await bot.add_cog(CharacterInfo(bot, database))
\ No newline at end of file
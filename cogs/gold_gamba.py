@@ -1,8 +1,168 @@
 import discord
 import asyncio
+import os
 import random
+from datetime import datetime, timezone
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+
+PAYOUT_QUEUE_PAGE_SIZE = 10
+LEDGER_REFRESH_MINUTES = float(os.getenv("LEDGER_REFRESH_MINUTES", "5"))
+
+
+def payout_destination(row: dict) -> str:
+    """character-server a payout goes to; requests from before it was stored have neither."""
+    if not row.get('character'):
+        return "unknown character"
+    return f"{row['character']}-{row['server']}"
+
+
+def payout_embed(user_id: int, amount: int, character: str, server: str, status: str, payout_id: int) -> discord.Embed:
+    """The payout request embed posted to gamba-payouts."""
+    embed = discord.Embed(
+        title="💰 Payout Request",
+        color=discord.Color.gold()
+    )
+    embed.add_field(name="User", value=f"<@{user_id}>", inline=True)
+    embed.add_field(name="Amount", value=f"{amount:,}g", inline=True)
+    embed.add_field(name="Character", value=character, inline=True)
+    embed.add_field(name="Server", value=server, inline=True)
+    embed.add_field(name="Status", value=status, inline=True)
+    embed.set_footer(text=f"Payout ID: {payout_id}")
+    return embed
+
+
+class PayoutQueueView(discord.ui.View):
+    """One page of the pending payout queue with paging and bulk completion."""
+
+    def __init__(self, client, db, officer_id: int, rows: list, page: int = 1):
+        super().__init__(timeout=300)
+        self.client = client
+        self.db = db
+        self.officer_id = officer_id
+        self.rows = rows
+        self.page = page
+        self.history = []  # keyset cursors of previous pages
+
+        if rows:
+            self.complete_select = discord.ui.Select(
+                placeholder="Mark payouts as complete...",
+                min_values=1,
+                max_values=len(rows),
+                options=[
+                    discord.SelectOption(
+                        label=f"#{row['id']} - {row['amount']:,}g",
+                        description=f"User {row['user_id']} -> {payout_destination(row)}"[:100],
+                        value=str(row['id'])
+                    )
+                    for row in rows
+                ]
+            )
+            self.complete_select.callback = self.complete_selected
+            self.add_item(self.complete_select)
+
+        self.previous_page.disabled = page == 1
+        self.next_page.disabled = len(rows) < PAYOUT_QUEUE_PAGE_SIZE
+
+    def build_embed(self) -> discord.Embed:
+        embed = discord.Embed(
+            title="🧾 Pending Payout Queue",
+            color=discord.Color.gold()
+        )
+        if not self.rows:
+            embed.description = "No pending payouts. 🎉"
+        else:
+            embed.description = "\n".join(
+                f"**#{row['id']}** <@{row['user_id']}> - **{row['amount']:,}g** to **{payout_destination(row)}**"
+                f" (requested {row['requested_at']} UTC){self.message_link(row)}"
+                for row in self.rows
+            )
+        embed.set_footer(text=f"Page {self.page} - oldest first")
+        return embed
+
+    def message_link(self, row: dict) -> str:
+        if not row['message_id']:
+            return ""
+        channel = self.guild_channel(row['channel_id'])
+        if channel is None:
+            return ""
+        return f" [request](https://discord.com/channels/{channel.guild.id}/{channel.id}/{row['message_id']})"
+
+    def guild_channel(self, channel_id: int):
+        return self.client.get_channel(channel_id) if channel_id else None
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.officer_id:
+            await interaction.response.send_message("This queue view belongs to another officer.", ephemeral=True)
+            return False
+        return True
+
+    async def show_page(self, interaction: discord.Interaction, rows: list, page: int, history: list):
+        view = PayoutQueueView(self.client, self.db, self.officer_id, rows, page)
+        view.history = history
+        await interaction.response.edit_message(embed=view.build_embed(), view=view)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        history = self.history[:-1]
+        after = history[-1] if history else None
+        rows = await self.db.get_pending_payouts(PAYOUT_QUEUE_PAGE_SIZE, after)
+        await self.show_page(interaction, rows, self.page - 1, history)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        last = self.rows[-1]
+        after = (last['requested_at'], last['id'])
+        rows = await self.db.get_pending_payouts(PAYOUT_QUEUE_PAGE_SIZE, after)
+        await self.show_page(interaction, rows, self.page + 1, self.history + [after])
+
+    async def complete_selected(self, interaction: discord.Interaction):
+        payout_ids = [int(value) for value in self.complete_select.values]
+        paid_rows = await self.db.complete_payouts(payout_ids, interaction.user.id)
+        paid = {}
+        for row in paid_rows:
+            paid[row['user_id']] = paid.get(row['user_id'], 0) + row['amount']
+
+        # Re-read the current page so completed rows drop out of the queue
+        after = self.history[-1] if self.history else None
+        rows = await self.db.get_pending_payouts(PAYOUT_QUEUE_PAGE_SIZE, after)
+        await self.show_page(interaction, rows, self.page, self.history)
+
+        if paid:
+            summary = "\n".join(f"<@{user_id}>: **{amount:,}g**" for user_id, amount in paid.items())
+            await interaction.followup.send(f"✅ Completed {len(paid_rows)} payout(s):\n{summary}", ephemeral=True)
+        else:
+            await interaction.followup.send("Those payouts were already processed.", ephemeral=True)
+
+        # Close out the request messages in gamba-payouts so nobody pays them twice
+        for row in paid_rows:
+            channel = self.guild_channel(row['channel_id'])
+            if channel is None or not row['message_id']:
+                continue
+            embed = payout_embed(
+                row['user_id'], row['amount'], row['character'], row['server'], "Complete", row['id']
+            )
+            try:
+                await channel.get_partial_message(row['message_id']).edit(embed=embed, view=None)
+            except discord.HTTPException as e:
+                print(f"[Payouts] Could not update request message for payout {row['id']}: {e}")
+
+        for user_id, amount in paid.items():
+            user = interaction.guild.get_member(user_id)
+            if not user:
+                continue
+            try:
+                new_balance = await self.db.get_gold_balance(user_id) or 0
+                await user.send(
+                    embed=discord.Embed(
+                        title="Payout Completed!",
+                        description=f"**{amount:,}g** has been mailed to you. Please wait up to an hour for mail to arrive.\nNew balance: **{new_balance:,}g**",
+                        color=discord.Color.green()
+                    )
+                )
+            except discord.Forbidden:
+                pass
 
 
 class GoldGamba(commands.Cog):
@@ -11,6 +171,100 @@ class GoldGamba(commands.Cog):
         self.db = database
         self.active_wheel_users = set()  # Track users currently spinning
 
+        # Economy snapshot, rolled forward from the ledger id watermark
+        self.economy = {
+            "total_credited": 0,
+            "total_balances": 0,
+            "bet_volume": 0,
+            "bet_count": 0,
+            "lottery_ticket_sales": 0,
+            "lottery_guild_cut": 0,
+        }
+        self.ledger_watermark = 0
+        self.economy_updated_at = None
+        self.economy_lock = asyncio.Lock()
+        self.refresh_economy.start()
+
+    def cog_unload(self):
+        self.refresh_economy.cancel()
+
+    async def update_economy_snapshot(self):
+        """Apply ledger rows newer than the watermark to the cached snapshot and re-total the lottery guild cut."""
+        async with self.economy_lock:
+            # Every writer's transaction holds write_lock, so reading under it never
+            # sees ledger rows that could still roll back behind the watermark
+            async with self.db.write_lock:
+                max_id, totals = await self.db.get_ledger_totals_since(self.ledger_watermark)
+            for reason, (amount, count) in totals.items():
+                self.economy["total_balances"] += amount
+                if reason == "credit":
+                    self.economy["total_credited"] += amount
+                elif reason == "bet":
+                    self.economy["bet_volume"] += -amount
+                    self.economy["bet_count"] += count
+                elif reason == "lottery_ticket":
+                    self.economy["lottery_ticket_sales"] += -amount
+            self.ledger_watermark = max_id
+
+            # lottery_winners is one row per draw, cheap to total in full
+            self.economy["lottery_guild_cut"] = await self.db.get_lottery_guild_cut_total()
+
+            self.economy_updated_at = datetime.now(timezone.utc)
+
+    def build_ledger_embed(self) -> discord.Embed:
+        total_credited = self.economy["total_credited"]
+        total_balances = self.economy["total_balances"]
+        house_position = total_credited - total_balances
+
+        embed = discord.Embed(
+            title="📒 Gold Ledger Overview",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Total Gold Credited", value=f"**{total_credited:,}g**", inline=False)
+        embed.add_field(name="Total Player Balances", value=f"**{total_balances:,}g**", inline=False)
+        embed.add_field(name="Guild Position", value=f"**{house_position:,}g**", inline=False)
+        embed.add_field(name="Lottery Guild Cut", value=f"**{self.economy['lottery_guild_cut']:,}g**", inline=True)
+        embed.add_field(name="Lottery Ticket Sales", value=f"**{self.economy['lottery_ticket_sales']:,}g**", inline=True)
+        embed.add_field(
+            name="Bet Volume",
+            value=f"**{self.economy['bet_volume']:,}g** over {self.economy['bet_count']:,} bets",
+            inline=True
+        )
+        updated = f"{self.economy_updated_at:%Y-%m-%d %H:%M:%S} UTC" if self.economy_updated_at else "never"
+        embed.set_footer(text=f"Guild Position = Credited − Outstanding Balances • Updated {updated}")
+        return embed
+
+    # ----------------------
+    # Background refresh of the economy snapshot and pinned dashboard
+    # ----------------------
+    @tasks.loop(minutes=LEDGER_REFRESH_MINUTES)
+    async def refresh_economy(self):
+        try:
+            await self.update_economy_snapshot()
+        except Exception as e:
+            print(f"[Ledger] Failed to refresh economy snapshot: {e}")
+            return
+
+        dashboard = await self.db.get_ledger_dashboard()
+        if not dashboard:
+            return
+
+        channel_id, message_id = dashboard
+        channel = self.bot.get_channel(channel_id)
+        if not channel:
+            return
+        try:
+            await channel.get_partial_message(message_id).edit(embed=self.build_ledger_embed())
+        except discord.NotFound:
+            # Dashboard message was deleted, stop updating it
+            await self.db.set_ledger_dashboard(None, None)
+        except discord.HTTPException as e:
+            print(f"[Ledger] Failed to update dashboard: {e}")
+
+    @refresh_economy.before_loop
+    async def before_refresh_economy(self):
+        await self.bot.wait_until_ready()
+
     # ----------------------
     # /balance
     # ----------------------
@@ -250,7 +504,7 @@ class GoldGamba(commands.Cog):
             )
             return
 
-        payout_id = await self.db.create_payout_request(interaction.user.id, amount)
+        payout_id = await self.db.create_payout_request(interaction.user.id, amount, character, server)
 
         # Send confirmation to the user
         await interaction.response.send_message(
@@ -260,18 +514,9 @@ class GoldGamba(commands.Cog):
 
         # Notify officers in the gamba-payouts channel as an embed
         guild = interaction.guild
-        payout_channel = discord.utils.get(guild.text_channels, name="gamba-payouts")
+        payout_channel = self.bot.resolver.text_channel(guild, "gamba-payouts")
         if payout_channel:
-            embed = discord.Embed(
-                title="💰 Payout Request",
-                color=discord.Color.gold()
-            )
-            embed.add_field(name="User", value=interaction.user.mention, inline=True)
-            embed.add_field(name="Amount", value=f"{amount:,}g", inline=True)
-            embed.add_field(name="Character", value=character, inline=True)
-            embed.add_field(name="Server", value=server, inline=True)
-            embed.add_field(name="Status", value="Waiting", inline=True)
-            embed.set_footer(text=f"Payout ID: {payout_id}")
+            embed = payout_embed(interaction.user.id, amount, character, server, "Waiting", payout_id)
 
             class PayoutSelect(discord.ui.Select):
                 def __init__(self, db, embed):
@@ -291,7 +536,16 @@ class GoldGamba(commands.Cog):
                         user_mention = self.embed.fields[0].value
                         user_id = int(user_mention.strip('<@!>'))
 
-                        await self.db.complete_payout(payout_id, officer_id)
+                        try:
+                            await self.db.complete_payout(payout_id, officer_id)
+                        except ValueError as e:
+                            # Already completed from /payoutqueue (or by another officer)
+                            status = "Complete" if "already processed" in str(e) else "Not found"
+                            self.embed.set_field_at(4, name="Status", value=status, inline=True)
+                            self.disabled = True
+                            await interaction.response.edit_message(embed=self.embed, view=self.view)
+                            await interaction.followup.send(f"⚠️ {e}.", ephemeral=True)
+                            return
 
                         # Update the embed's status field
                         self.embed.set_field_at(4, name="Status", value="Complete", inline=True)
@@ -326,7 +580,18 @@ class GoldGamba(commands.Cog):
 
             view = discord.ui.View()
             view.add_item(PayoutSelect(self.db, embed))
-            await payout_channel.send(embed=embed, view=view)
+            message = await payout_channel.send(embed=embed, view=view)
+            await self.db.set_payout_message(payout_id, payout_channel.id, message.id)
+
+    # ----------------------
+    # /payoutqueue (OFFICER ONLY)
+    # ----------------------
+    @app_commands.command(name="payoutqueue", description="List pending payout requests, oldest first (officers only)")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def payoutqueue(self, interaction: discord.Interaction):
+        rows = await self.db.get_pending_payouts(PAYOUT_QUEUE_PAGE_SIZE)
+        view = PayoutQueueView(self.bot, self.db, interaction.user.id, rows)
+        await interaction.response.send_message(embed=view.build_embed(), view=view, ephemeral=True)
 
     
     # ----------------------
@@ -336,20 +601,35 @@ class GoldGamba(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def ledger(self, interaction: discord.Interaction):
         """Officer-only command showing gold credited vs outstanding balances."""
-        total_credited = await self.db.get_total_credited_gold()
-        total_balances = await self.db.get_total_gold_balance()
-        house_position = total_credited - total_balances
+        if self.economy_updated_at is None:
+            await self.update_economy_snapshot()
 
-        embed = discord.Embed(
-            title="📒 Gold Ledger Overview",
-            color=discord.Color.blue()
-        )
-        embed.add_field(name="Total Gold Credited", value=f"**{total_credited:,}g**", inline=False)
-        embed.add_field(name="Total Player Balances", value=f"**{total_balances:,}g**", inline=False)
-        embed.add_field(name="Guild Position", value=f"**{house_position:,}g**", inline=False)
-        embed.set_footer(text="Guild Position = Credited − Outstanding Balances")
+        await interaction.response.send_message(embed=self.build_ledger_embed(), ephemeral=True)
+
+    # ----------------------
+    # /ledgerdashboard (Pinned, auto-updating ledger overview)
+    # ----------------------
+    @app_commands.command(name="ledgerdashboard", description="Post (or remove) an auto-updating ledger overview in this channel")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def ledgerdashboard(self, interaction: discord.Interaction, enabled: bool = True):
+        if not enabled:
+            await self.db.set_ledger_dashboard(None, None)
+            await interaction.response.send_message("Ledger dashboard disabled.", ephemeral=True)
+            return
+
+        if self.economy_updated_at is None:
+            await self.update_economy_snapshot()
 
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(
+            f"Ledger dashboard posted. It refreshes every {LEDGER_REFRESH_MINUTES:g} minute(s).",
+            ephemeral=True
+        )
+        message = await interaction.channel.send(embed=self.build_ledger_embed())
+        try:
+            await message.pin()
+        except discord.HTTPException:
+            pass
+        await self.db.set_ledger_dashboard(interaction.channel.id, message.id)
 
 async def setup(bot, database):
     await bot.add_cog(GoldGamba(bot, database))
@@ -1,209 +1,421 @@
 import discord
+import asyncio
+import os
+from collections import Counter
 from discord.ext import commands, tasks
 from discord import app_commands
 from datetime import datetime, timedelta, timezone
 
 
+# Minimum seconds between edits of a lottery announcement message
+LOTTERY_EDIT_INTERVAL = float(os.getenv("LOTTERY_EDIT_INTERVAL_SECONDS", "10"))
+
+# Lottery tiers. The scheduler keeps one active lottery running per tier.
+# Settings are copied onto the lottery row when it starts, so editing a tier
+# only affects the next lottery of that tier.
+LOTTERY_TIERS = {
+    "standard": {
+        "name": "Lottery",
+        "ticket_price": 5000,
+        "guild_cut_percent": 20,
+        "max_tickets": 20,
+        "duration": timedelta(weeks=2),
+    },
+    "daily": {
+        "name": "Daily Lottery",
+        "ticket_price": 1000,
+        "guild_cut_percent": 10,
+        "max_tickets": 10,
+        "duration": timedelta(days=1),
+    },
+    "highroller": {
+        "name": "High Roller Lottery",
+        "ticket_price": 50000,
+        "guild_cut_percent": 20,
+        "max_tickets": 5,
+        "duration": timedelta(weeks=1),
+    },
+}
+
+
+def parse_time(value):
+    """Lottery times come back from SQLite as ISO strings."""
+    value = datetime.fromisoformat(value) if isinstance(value, str) else value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def tier_name(tier: str) -> str:
+    return LOTTERY_TIERS.get(tier, {}).get("name", "Lottery")
+
+
 class Lottery(commands.Cog):
     def __init__(self, bot, database):
         self.bot = bot
         self.db = database
         self.lottery_channel_name = "lottery"  # channel name for lottery announcements
-        self.lottery_task.start()  # start the background task to run lotteries automatically
-        
+
+        # In-memory state for every active lottery, loaded by the scheduler.
+        # lottery_id -> {"lottery": row, "total_tickets": int, "user_tickets": {user_id: int}, "message": PartialMessage}
+        # /buyticket reads and updates these instead of querying lotteries/lottery_tickets.
+        self.lotteries = {}
+        self.active_by_tier = {}  # tier -> lottery_id
+
+        # Debounced announcement updates: purchases only mark a lottery dirty,
+        # announcement_updater applies at most one edit per lottery per interval.
+        self.dirty_lotteries = set()
+
+        # /lotterystats caches: participation summary per lottery (dropped on purchase)
+        # and pot history per tier (dropped when a lottery of that tier is drawn)
+        self.stats_cache = {}
+        self.pot_history_cache = {}
+
+        # Scheduler task, sleeps until the earliest end_time
+        self.scheduler = None
+
+        self.announcement_updater.start()
+
+    async def cog_load(self):
+        self.scheduler = asyncio.create_task(self.run_scheduler())
+
+    def cog_unload(self):
+        if self.scheduler:
+            self.scheduler.cancel()
+        self.announcement_updater.cancel()
+
+    def announcement_message(self, state: dict):
+        """Return a PartialMessage for the lottery announcement, no fetch needed to edit."""
+        if state["message"] is None and state["lottery"]["message_id"] and self.bot.guilds:
+            channel = self.bot.resolver.text_channel(self.bot.guilds[0], self.lottery_channel_name)
+            if channel:
+                state["message"] = channel.get_partial_message(state["lottery"]["message_id"])
+        return state["message"]
 
 
     # ----------------------
     # /buyticket command
     # ----------------------
     @app_commands.command(name="buyticket", description="Buy lottery tickets")
-    @app_commands.describe(amount="Number of tickets to buy")
-    @app_commands.choices(amount=[
-        app_commands.Choice(name="1 ticket", value=1),
-        app_commands.Choice(name="2 tickets", value=2),
-        app_commands.Choice(name="5 tickets", value=5),
-        app_commands.Choice(name="10 tickets", value=10),
-    ])
-    async def buyticket(self, interaction: discord.Interaction, amount: int):
+    @app_commands.describe(amount="Number of tickets to buy", tier="Which lottery to enter")
+    @app_commands.choices(
+        amount=[
+            app_commands.Choice(name="1 ticket", value=1),
+            app_commands.Choice(name="2 tickets", value=2),
+            app_commands.Choice(name="5 tickets", value=5),
+            app_commands.Choice(name="10 tickets", value=10),
+        ],
+        tier=[app_commands.Choice(name=config["name"], value=key) for key, config in LOTTERY_TIERS.items()]
+    )
+    async def buyticket(self, interaction: discord.Interaction, amount: int, tier: str = "standard"):
 
         user_id = interaction.user.id
-        active_lottery = await self.db.get_active_lottery()
-        if not active_lottery:
-            await interaction.response.send_message("There is no active lottery at the moment.", ephemeral=True)
+        state = self.lotteries.get(self.active_by_tier.get(tier))
+        if not state:
+            await interaction.response.send_message(f"There is no active {tier_name(tier)} at the moment.", ephemeral=True)
             return
 
+        active_lottery = state["lottery"]
         lottery_id = active_lottery['id']
         ticket_price = int(active_lottery['ticket_price'])
-
-        user_balance = int(await self.db.get_gold_balance(user_id) or 0)
         total_cost = amount * ticket_price
 
-        if total_cost > user_balance:
-            await interaction.response.send_message("You do not have enough gold to buy that many tickets.", ephemeral=True)
-            return
-
+        # Reserve the tickets in memory before awaiting so concurrent buys see them
+        existing_tickets = state["user_tickets"].get(user_id, 0)
+        state["user_tickets"][user_id] = existing_tickets + amount
         try:
-            await self.db.buy_lottery_tickets(user_id, lottery_id, amount)
-            await self.db.add_ledger_entry(user_id, -total_cost, reason="lottery_ticket", reference_id=f"lottery:{lottery_id}")
-            new_balance = await self.db.get_gold_balance(user_id) or 0
-
-            await interaction.response.send_message(
-                f"You successfully bought {amount} lottery ticket(s) for {total_cost:,}g! New balance: {new_balance:,}g.",
-                ephemeral=True
+            new_balance = await self.db.purchase_tickets(
+                user_id,
+                lottery_id,
+                amount,
+                ticket_price,
+                max_tickets=active_lottery['max_tickets'],
+                existing_tickets=existing_tickets
             )
+        except Exception as e:
+            state["user_tickets"][user_id] -= amount
+            if not isinstance(e, ValueError):
+                raise
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
 
-            guild = interaction.guild
-            mod_log_channel = discord.utils.get(guild.text_channels, name="mod-logs")
-            if mod_log_channel:
-                await mod_log_channel.send(
-                    f"💰 {interaction.user.mention} bought {amount} lottery ticket(s) for Lottery #{active_lottery['lottery_number']} "
-                    f"for {total_cost:,}g. New balance: {new_balance:,}g."
-                )
-
+        state["total_tickets"] += amount
+        self.stats_cache.pop(lottery_id, None)
 
+        await interaction.response.send_message(
+            f"You successfully bought {amount} {tier_name(tier)} ticket(s) for {total_cost:,}g! New balance: {new_balance:,}g.\n"
+            f"Current pot: {state['total_tickets'] * ticket_price:,}g ({state['total_tickets']} tickets).",
+            ephemeral=True
+        )
 
+        guild = interaction.guild
+        mod_log_channel = self.bot.resolver.text_channel(guild, "mod-logs")
+        if mod_log_channel:
+            await mod_log_channel.send(
+                f"💰 {interaction.user.mention} bought {amount} lottery ticket(s) for {tier_name(tier)} #{active_lottery['lottery_number']} "
+                f"for {total_cost:,}g. New balance: {new_balance:,}g."
+            )
 
-        except ValueError as e:
-            await interaction.response.send_message(str(e), ephemeral=True)
+        self.dirty_lotteries.add(lottery_id)
 
+    # ----------------------
+    # /lotterystats command
+    # ----------------------
+    def participation_summary(self, state: dict) -> dict:
+        """Participants and tickets-per-player distribution, cached until the next purchase."""
+        lottery_id = state["lottery"]["id"]
+        summary = self.stats_cache.get(lottery_id)
+        if summary is None:
+            counts = [count for count in state["user_tickets"].values() if count > 0]
+            summary = {
+                "participants": len(counts),
+                "distribution": sorted(Counter(counts).items()),
+                "average": sum(counts) / len(counts) if counts else 0,
+            }
+            self.stats_cache[lottery_id] = summary
+        return summary
+
+    async def pot_history(self, tier: str):
+        rows = self.pot_history_cache.get(tier)
+        if rows is None:
+            rows = await self.db.get_lottery_pot_history(tier)
+            self.pot_history_cache[tier] = rows
+        return rows
+
+    @app_commands.command(name="lotterystats", description="Show your odds and lottery participation stats")
+    @app_commands.describe(tier="Which lottery to show")
+    @app_commands.choices(
+        tier=[app_commands.Choice(name=config["name"], value=key) for key, config in LOTTERY_TIERS.items()]
+    )
+    async def lotterystats(self, interaction: discord.Interaction, tier: str = "standard"):
+        state = self.lotteries.get(self.active_by_tier.get(tier))
+        history = await self.pot_history(tier)
+
+        embed = discord.Embed(
+            title=f"📊 {tier_name(tier)} Stats",
+            color=discord.Color.gold()
+        )
 
-        
+        if state:
+            lottery = state["lottery"]
+            total_tickets = state["total_tickets"]
+            user_tickets = state["user_tickets"].get(interaction.user.id, 0)
+            summary = self.participation_summary(state)
+            odds = user_tickets / total_tickets if total_tickets else 0
+
+            embed.description = f"**{tier_name(tier)} #{lottery['lottery_number']}** ends {parse_time(lottery['end_time']):%Y-%m-%d %H:%M UTC}"
+            embed.add_field(name="Current Pot", value=f"**{total_tickets * lottery['ticket_price']:,}g**", inline=True)
+            embed.add_field(name="Tickets Sold", value=f"**{total_tickets}**", inline=True)
+            embed.add_field(name="Players", value=f"**{summary['participants']}**", inline=True)
+            embed.add_field(
+                name="Your Odds",
+                value=f"**{odds:.1%}** ({user_tickets}/{lottery['max_tickets']} tickets)" if user_tickets else "You have no tickets yet.",
+                inline=False
+            )
+            if summary["distribution"]:
+                embed.add_field(
+                    name="Tickets per Player",
+                    value="\n".join(
+                        f"{tickets} ticket(s): {players} player(s)" for tickets, players in summary["distribution"]
+                    ) + f"\nAverage: {summary['average']:.1f}",
+                    inline=False
+                )
+        else:
+            embed.description = f"There is no active {tier_name(tier)} at the moment."
 
-        total_tickets = await self.db.get_lottery_total_tickets(lottery_id)
+        if history:
+            lines = []
+            for i, (lottery_number, end_time, total_pot, payout, ticket_count) in enumerate(history):
+                trend = ""
+                if i + 1 < len(history):
+                    previous_pot = history[i + 1][2]
+                    trend = " 📈" if total_pot > previous_pot else " 📉" if total_pot < previous_pot else " ➖"
+                lines.append(f"#{lottery_number} ({parse_time(end_time):%Y-%m-%d}): **{total_pot:,}g** from {ticket_count} tickets{trend}")
+            embed.add_field(name="Recent Pots", value="\n".join(lines), inline=False)
 
-        message_id = active_lottery["message_id"]
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        guild = interaction.guild
-        channel = discord.utils.get(guild.text_channels, name=self.lottery_channel_name)
+    # ----------------------
+    # Debounced announcement updater
+    # ----------------------
+    @tasks.loop(seconds=LOTTERY_EDIT_INTERVAL)
+    async def announcement_updater(self):
+        dirty, self.dirty_lotteries = self.dirty_lotteries, set()
+
+        for lottery_id in dirty:
+            state = self.lotteries.get(lottery_id)
+            if not state:
+                continue  # closed since the purchase
+            message = self.announcement_message(state)
+            if not message:
+                continue
 
-        if channel and message_id:
             try:
-                message = await channel.fetch_message(message_id)
-                # Convert string dates to datetime objects
-                start_time = datetime.fromisoformat(active_lottery["start_time"]) if isinstance(active_lottery["start_time"], str) else active_lottery["start_time"]
-                end_time = datetime.fromisoformat(active_lottery["end_time"]) if isinstance(active_lottery["end_time"], str) else active_lottery["end_time"]
-                
-                new_text = self.format_lottery_message(
-                    lottery_number=active_lottery["lottery_number"],
-                    start_time=start_time,
-                    end_time=end_time,
-                    ticket_price=active_lottery["ticket_price"],
-                    guild_cut=active_lottery["guild_cut_percent"],
-                    total_tickets=total_tickets
-                )
-                await message.edit(content=new_text)
+                await message.edit(content=self.format_lottery_message(state["lottery"], state["total_tickets"]))
             except discord.NotFound:
-                pass
+                state["lottery"]["message_id"] = None
+                state["message"] = None
+            except discord.HTTPException as e:
+                # Retry on the next tick
+                print(f"[Lottery] Failed to update announcement: {e}")
+                self.dirty_lotteries.add(lottery_id)
+
+    @announcement_updater.before_loop
+    async def before_announcement_updater(self):
+        await self.bot.wait_until_ready()
+
 
 
 
-    
-    def format_lottery_message(
-        self,
-        lottery_number: int,
-        start_time,
-        end_time,
-        ticket_price: int,
-        guild_cut: int,
-        total_tickets: int
-    ) -> str:
+    def format_lottery_message(self, lottery: dict, total_tickets: int) -> str:
+        ticket_price = lottery["ticket_price"]
         total_pot = total_tickets * ticket_price
+        tier = lottery["tier"]
+        command_hint = "`/buyticket`" if tier == "standard" else f"`/buyticket tier:{tier_name(tier)}`"
 
         return (
-            f"🎟️ **LOTTERY #{lottery_number} IS LIVE!**\n\n"
+            f"🎟️ **{tier_name(tier).upper()} #{lottery['lottery_number']} IS LIVE!**\n\n"
             f"**Rules**\n"
             f"• Ticket Price: **{ticket_price:,}g**\n"
-            f"• Max Tickets per Player: **20**\n"
-            f"• Guild Cut: **{guild_cut}%**\n\n"
+            f"• Max Tickets per Player: **{lottery['max_tickets']}**\n"
+            f"• Guild Cut: **{lottery['guild_cut_percent']}%**\n\n"
             f"**Schedule**\n"
-            f"• Start: {start_time:%Y-%m-%d %H:%M UTC}\n"
-            f"• End: {end_time:%Y-%m-%d %H:%M UTC}\n\n"
+            f"• Start: {parse_time(lottery['start_time']):%Y-%m-%d %H:%M UTC}\n"
+            f"• End: {parse_time(lottery['end_time']):%Y-%m-%d %H:%M UTC}\n\n"
             f"💰 **CURRENT POT:** **{total_pot:,}g**\n"
             f"🎫 **TOTAL TICKETS SOLD:** **{total_tickets}**\n\n"
-            f"Use `/buyticket` to enter!"
+            f"Use {command_hint} to enter!"
         )
 
     # ----------------------
-    # Background task to run lotteries automatically
+    # Deadline-driven lottery scheduler
     # ----------------------
-    @tasks.loop(minutes=1)
-    async def lottery_task(self):
-        now = datetime.now(timezone.utc)
-        active_lottery = await self.db.get_active_lottery()
-
-        # Check if a new lottery should be created
-        if not active_lottery:
-            start_time = now
-            end_time = start_time + timedelta(weeks=2)
-            lottery_id = await self.db.create_lottery(start_time, end_time)
-            
-            # Fetch the created lottery to get lottery_number
-            created_lottery = await self.db.get_active_lottery()
-            if not created_lottery:
-                return  # Should not happen, but safety check
-
-            # Announce the lottery in the lottery channel
-            guild = self.bot.guilds[0]  # assuming single guild
-            lottery_channel = discord.utils.get(guild.text_channels, name=self.lottery_channel_name)
-            if lottery_channel:
-                message_text = self.format_lottery_message(
-                    lottery_number=created_lottery['lottery_number'],
-                    start_time=start_time,
-                    end_time=end_time,
-                    ticket_price=5000,
-                    guild_cut=20,
-                    total_tickets=0
-                )
+    async def run_scheduler(self):
+        """Sleep until the earliest lottery end_time, close what has ended, then top up the tiers."""
+        await self.bot.wait_until_ready()
 
-                message = await lottery_channel.send(message_text)
+        while True:
+            try:
+                await self.sync_lotteries()
+
+                now = datetime.now(timezone.utc)
+                next_end = min(parse_time(state["lottery"]["end_time"]) for state in self.lotteries.values())
+                delay = (next_end - now).total_seconds()
+                if delay > 0:
+                    # Lotteries are only created in this loop, so nothing can move the deadline earlier
+                    await asyncio.sleep(delay)
+
+                # Deadline reached (or already overdue after a restart)
+                now = datetime.now(timezone.utc)
+                for state in list(self.lotteries.values()):
+                    if parse_time(state["lottery"]["end_time"]) <= now:
+                        await self.finish_lottery(state)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Lottery] Scheduler error: {e}")
+                await asyncio.sleep(60)
+
+    async def sync_lotteries(self):
+        """Load active lotteries into memory and start one for every tier that has none."""
+        rows = await self.db.get_active_lotteries()
+        active_ids = {row["id"] for row in rows}
+
+        for lottery_id in [lottery_id for lottery_id in self.lotteries if lottery_id not in active_ids]:
+            del self.lotteries[lottery_id]
+
+        for row in rows:
+            if row["id"] in self.lotteries:
+                self.lotteries[row["id"]]["lottery"] = row
+                continue
+            user_tickets = await self.db.get_lottery_ticket_counts(row["id"])
+            self.lotteries[row["id"]] = {
+                "lottery": row,
+                "total_tickets": sum(user_tickets.values()),
+                "user_tickets": user_tickets,
+                "message": None,
+            }
+
+        self.active_by_tier = {}
+        for state in self.lotteries.values():
+            self.active_by_tier.setdefault(state["lottery"]["tier"], state["lottery"]["id"])
+
+        for tier in LOTTERY_TIERS:
+            if tier not in self.active_by_tier:
+                await self.start_lottery(tier)
+
+    async def start_lottery(self, tier: str):
+        """Create, load and announce a new lottery for a tier."""
+        config = LOTTERY_TIERS[tier]
+        start_time = datetime.now(timezone.utc)
+        end_time = start_time + config["duration"]
+        lottery_id = await self.db.create_lottery(
+            start_time,
+            end_time,
+            ticket_price=config["ticket_price"],
+            guild_cut_percent=config["guild_cut_percent"],
+            tier=tier,
+            max_tickets=config["max_tickets"]
+        )
 
-                await self.db.conn.execute(
-                    "UPDATE lotteries SET message_id = ? WHERE id = ?",
-                    (message.id, lottery_id)
-                )
-                await self.db.conn.commit()
+        # Re-read the created lottery to get lottery_number
+        created_lottery = next(row for row in await self.db.get_active_lotteries() if row["id"] == lottery_id)
+        state = {"lottery": created_lottery, "total_tickets": 0, "user_tickets": {}, "message": None}
+        self.lotteries[lottery_id] = state
+        self.active_by_tier[tier] = lottery_id
+
+        # Announce the lottery in the lottery channel
+        guild = self.bot.guilds[0]  # assuming single guild
+        lottery_channel = self.bot.resolver.text_channel(guild, self.lottery_channel_name)
+        if lottery_channel:
+            message = await lottery_channel.send(self.format_lottery_message(created_lottery, 0))
+            await self.db.set_lottery_message_id(lottery_id, message.id)
+            created_lottery['message_id'] = message.id
+            state["message"] = message
+
+        print(f"[Lottery] Started {tier_name(tier)} #{created_lottery['lottery_number']}, ends {end_time:%Y-%m-%d %H:%M UTC}")
+
+    async def finish_lottery(self, state: dict):
+        """Draw the winner of an ended lottery and announce the result."""
+        active_lottery = state["lottery"]
+        lottery_id = active_lottery['id']
+        name = tier_name(active_lottery['tier'])
 
+        # Stop sales before drawing
+        self.lotteries.pop(lottery_id, None)
+        if self.active_by_tier.get(active_lottery['tier']) == lottery_id:
+            del self.active_by_tier[active_lottery['tier']]
+        self.dirty_lotteries.discard(lottery_id)
+        self.stats_cache.pop(lottery_id, None)
 
+        payout_info = await self.db.close_lottery(lottery_id)
+        self.pot_history_cache.pop(active_lottery['tier'], None)
+
+        guild = self.bot.guilds[0]
+        lottery_channel = self.bot.resolver.text_channel(guild, self.lottery_channel_name)
+        if not lottery_channel:
+            return
+
+        if payout_info:
+            message_id = active_lottery['message_id']
+            if message_id:
+                try:
+                    await lottery_channel.get_partial_message(message_id).delete()
+                except discord.NotFound:
+                    pass
+
+            winner = guild.get_member(payout_info["winner_user_id"])
+            winner_text = winner.mention if winner else f"<@{payout_info['winner_user_id']}>"
+
+            await lottery_channel.send(
+                f"🎉 **{name.upper()} #{active_lottery['lottery_number']} COMPLETE!**\n\n"
+                f"🏆 Winner: {winner_text}\n"
+                f"💰 Total Pot: **{payout_info['total_pot']:,}g**\n"
+                f"🏛️ Guild Cut: **{payout_info['guild_cut']:,}g**\n"
+                f"💎 Payout: **{payout_info['payout']:,}g**"
+            )
         else:
-            # Check if the active lottery has ended
-            lottery_id = active_lottery['id']
-            end_time_str = active_lottery['end_time']
-            end_time = datetime.fromisoformat(end_time_str) if isinstance(end_time_str, str) else end_time_str
-            if now >= end_time:
-                payout_info = await self.db.close_lottery(lottery_id)
-                guild = self.bot.guilds[0]
-                lottery_channel = discord.utils.get(guild.text_channels, name=self.lottery_channel_name)
-                if lottery_channel:
-                    if payout_info:
-                        
-                        message_id = active_lottery['message_id']
-                        channel = discord.utils.get(guild.text_channels, name=self.lottery_channel_name)
-
-                        if channel and message_id:
-                            try:
-                                message = await channel.fetch_message(message_id)
-                                await message.delete()
-                            except discord.NotFound:
-                                pass
-
-                        
-                        winner = guild.get_member(payout_info["winner_user_id"])
-                        winner_text = winner.mention if winner else f"<@{payout_info['winner_user_id']}>"
-
-                        await channel.send(
-                            f"🎉 **LOTTERY #{active_lottery['lottery_number']} COMPLETE!**\n\n"
-                            f"🏆 Winner: {winner_text}\n"
-                            f"💰 Total Pot: **{payout_info['total_pot']:,}g**\n"
-                            f"🏛️ Guild Cut: **{payout_info['guild_cut']:,}g**\n"
-                            f"💎 Payout: **{payout_info['payout']:,}g**"
-                        )
-                    else:
-                        await lottery_channel.send(f"Lottery #{lottery_id} ended with no tickets purchased.")
-
-
-    @lottery_task.before_loop
-    async def before_lottery_task(self):
-        await self.bot.wait_until_ready()
+            await lottery_channel.send(f"{name} #{active_lottery['lottery_number']} ended with no tickets purchased.")
 
 
 async def setup(bot, database):
@@ -1,12 +1,9 @@
-import discord
 from discord.ext import commands, tasks
 import os
 import json
-import requests
-import asyncio
+import raid_provisioning
 from datetime import datetime, timezone
 
-RAIDER_IO_BASE_URL = "https://raider.io/api/v1/raiding/static-data"
 BOT_DATA_FILE = "bot_data.json"
 
 
@@ -37,112 +34,57 @@ class WeeklyRaidUpdater(commands.Cog):
             print("Guild not found.")
             return
 
-        raid_strats_category = discord.utils.get(guild.categories, name="Raid Strats")
-        archive_category = discord.utils.get(guild.categories, name="ARCHIVED")
-        existing_channels = []
-
-        if raid_strats_category:
-            existing_channels += raid_strats_category.text_channels
-        if archive_category:
-            existing_channels += archive_category.text_channels
-        
+        raid_strats_category = self.bot.resolver.category(guild, "Raid Strats")
+        archive_category = self.bot.resolver.category(guild, "ARCHIVED")
+        if not raid_strats_category:
+            await mod_logs.send("Category 'Raid Strats' not found.")
+            return
 
-        # Construct the URL with the provided expansion_id
-        url = f"{RAIDER_IO_BASE_URL}?expansion_id={expansion_id}"
-        response = requests.get(url)
-        print(f"Raider.io API Response: {response.status_code}")  # Debugging
-        
-        if response.status_code != 200:
+        # Conditional fetch, most weeks Raider.io answers 304 Not Modified
+        static_data = await raid_provisioning.fetch_static_data(self.db, expansion_id)
+        if static_data is None:
             await mod_logs.send(
                 "Failed to fetch data from Raider.io API."
             )
             return
-        raid_data = response.json()
+        if not static_data["changed"]:
+            print("Raid data unchanged since the last update, skipping.")
+            return
         print("Raid data fetched successfully")  # Debugging
 
         # --- STEP 1: Extract the raid data ---
-        raids = raid_data.get("raids", [])
+        raids = static_data["raids"]
         if not raids:
             await mod_logs.send(
                 "No raids found for this expansion."
             )
             return
         
-        for new_raid in raids:
-                raid_name = new_raid.get("name")
-                formatted_raid_name = raid_name.lower().replace(" ", "-")
-                bosses = new_raid.get("encounters", [])
-                print(f"Processing raid: {raid_name}")  # Debugging
-
-                if not raid_name:
-                    await mod_logs.send(
-                        "Raid name not found in the API response."
-                    )
-                    return
-
-                
-                existing_channel = discord.utils.get(existing_channels, name=formatted_raid_name)
-                if existing_channel:
-                    await mod_logs.send(
-                        f"A channel for raid '{raid_name}' already exists."
-                    )
-                    continue
-
-                new_channel = await guild.create_text_channel(raid_name, category=raid_strats_category)
-                print(f"Created new channel: {new_channel.name}")  # Debugging
-
-                # --- STEP 4: Create threads for each boss ---
-                boss_threads = []
-                for boss in bosses:
-                    boss_name = boss.get("name")
-                    if not boss_name:
-                        continue  # Skip if no boss name
-
-                    # Create a thread for the boss
-                    try:
-                        thread = await new_channel.create_thread(
-                            name=boss_name,
-                            type=discord.ChannelType.public_thread
-                        )
-
-                        await asyncio.sleep(2) #wait for discord to properly register thread url
-
-                        await thread.send(f"# [Back to {new_channel.name}](https://discord.com/channels/{guild_id}/{new_channel.id})")
-
-                        boss_threads.append((boss_name, thread.id))
-                        print(f"Created thread for boss: {boss_name}")  # Debugging
-                    except discord.errors.HTTPException as e:
-                        # Handle rate limiting (429 error) and retry after delay
-                        if e.status == 429:
-                            retry_after = e.retry_after  # Time to wait before retrying
-                            await asyncio.sleep(retry_after)  # Wait the required amount of time
-                            # Retry creating the thread after waiting
-                            thread = await new_channel.create_thread(
-                                name=boss_name,
-                                type=discord.ChannelType.public_thread
-                            )
-
-                            await asyncio.sleep(2) #wait for discord to properly register thread url
-
-                            await thread.send(f"[# Back to {new_channel.name}](https://discord.com/channels/{guild_id}/{new_channel.id})")
-
-                            boss_threads.append((boss_name, thread.jump_url))
-                            print(f"Retried thread creation for boss: {boss_name}")  # Debugging
-                    await asyncio.sleep(1)
-
-                async for message in new_channel.history(limit=100):
-                    await message.delete()
-                    print(f"Deleted message: {message.content}")  # Debugging
-
-                # --- STEP 5: Create a message with links to each boss thread ---
+        # --- STEP 2: Plan the changes against the current channels and threads ---
+        current = await raid_provisioning.snapshot(raid_strats_category, archive_category)
+        plan = raid_provisioning.plan_raids(raids, current)
+        diff = raid_provisioning.format_plan(plan)
+        print(diff)  # Debugging
+        if not plan:
+            await self.db.set_raid_static_data_reconciled(expansion_id, static_data["content_hash"])
+            return
 
-                links_message = "\n".join(
-                    [f"# [{boss_name}](https://discord.com/channels/{guild_id}/{thread_url}) \n" 
-                    for boss_name, thread_url in boss_threads]
+        # --- STEP 3: Apply the plan ---
+        results = await raid_provisioning.apply_plan(guild, raid_strats_category, plan)
+        incomplete = False
+        for result in results:
+            if result["failed"]:
+                incomplete = True
+                await mod_logs.send(
+                    f"Could not create threads for {', '.join(result['failed'])} in '{result['raid']}'."
                 )
+        await mod_logs.send(
+            f"Weekly raid update applied, cleaned up {sum(result['removed'] for result in results)} thread notices:"
+            f"\n```diff\n{diff[:1800]}\n```"
+        )
 
-                await new_channel.send(links_message)
-                print(f"Sent links for raid '{raid_name}'")  # Debugging
+        if not incomplete:
+            await self.db.set_raid_static_data_reconciled(expansion_id, static_data["content_hash"])
 
     @update_raids_weekly.before_loop
     async def before_update_raids_weekly(self):
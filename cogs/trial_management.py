@@ -38,14 +38,14 @@ class TrialManagement(commands.Cog):
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
         # Look up the Trial Raider role in the guild.
-        trial_role = discord.utils.get(after.guild.roles, name=TRIAL_ROLE_NAME)
+        trial_role = self.bot.resolver.role(after.guild, TRIAL_ROLE_NAME)
         if not trial_role:
             print(f"Role '{TRIAL_ROLE_NAME}' not found in guild {after.guild.name}")
             return
 
         # 1. If the user has just received the Trial Raider role:
         if trial_role not in before.roles and trial_role in after.roles:
-            trials_channel = discord.utils.get(after.guild.channels, name=TRIAL_CHANNEL_NAME)
+            trials_channel = self.bot.resolver.channel(after.guild, TRIAL_CHANNEL_NAME)
             if not trials_channel:
                 print(f"Channel '{TRIAL_CHANNEL_NAME}' not found in guild {after.guild.name}")
                 return
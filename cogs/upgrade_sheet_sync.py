@@ -1,5 +1,6 @@
 import os
-import requests
+import asyncio
+import http_client
 from discord.ext import commands
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
@@ -26,24 +27,25 @@ class UpgradeSheetSync(commands.Cog):
             await interaction.response.send_message("You must be an admin to use this command.", ephemeral=True)
             return
         await interaction.response.send_message("Fetching upgrade data from WowAudit...", ephemeral=True)
-        boss_upgrades, raid_name = self.fetch_upgrade_data()
+        boss_upgrades, raid_name = await self.fetch_upgrade_data()
         if not boss_upgrades:
             await interaction.followup.send("No upgrade data found or API error.", ephemeral=True)
             return
         await interaction.followup.send("Updating Google Sheet...", ephemeral=True)
-        result = self.update_google_sheet(boss_upgrades, raid_name)
+        # The Google API client is blocking, keep it off the event loop
+        result = await asyncio.to_thread(self.update_google_sheet, boss_upgrades, raid_name)
         if result:
             await interaction.followup.send("✅ Sheet updated!", ephemeral=True)
         else:
             await interaction.followup.send("❌ Failed to update sheet.", ephemeral=True)
 
-    def fetch_upgrade_data(self):
+    async def fetch_upgrade_data(self):
         # Use /v1/wishlists endpoint
-        response = requests.get('https://wowaudit.com/v1/wishlists', headers=headers)
-        if response.status_code != 200:
+        response = await http_client.request("wowaudit", "GET", 'https://wowaudit.com/v1/wishlists', headers=headers)
+        if response.status != 200:
             print("Failed to fetch upgrade data")
             return {}, None
-        data = response.json()
+        data = response.data
         boss_upgrades = {}
         raid_name = None
         # For each character, get only the last instance (most recent raid)
@@ -1,9 +1,13 @@
-from playwright.sync_api import sync_playwright
-import time
-import requests
+from playwright.async_api import async_playwright
+from urllib.parse import urlparse
 import asyncio
+import http_client
+from raiderio_cache import RAIDERIO_PROFILE_URL, realm_slug
+import hashlib
+import json
 import os
 import time
+from datetime import datetime
 import discord
 from discord.ext import commands
 from discord import app_commands
@@ -16,16 +20,232 @@ WOW_AUDIT_URL = 'https://wowaudit.com/v1/characters'
 WOW_AUDIT_UPLOAD_URL = 'https://wowaudit.com/v1/wishlists'
 EMAIL = os.getenv('RAIDBOTS_EMAIL')
 PASSWORD = os.getenv('RAIDBOTS_PASSWORD')
-sim_string = []
+RAIDBOTS_SIM_SUBMIT_PATH = '/sim'  # POST made by "Run Droptimizer", returns {"simId": ...}
+RAIDBOTS_JOB_STATUS_PATH = '/api/job/'  # polled by the SPA while the job runs: {"job": {"state", "progress"}}
+RAIDBOTS_REPORT_DATA_PATH = '/reports/'  # report data fetched by the SPA when the job completes
+RAIDBOTS_REPORT_URL = 'https://www.raidbots.com/simbot/report/'
+# Header link only rendered for signed-in users, once the SPA's session request has returned
+RAIDBOTS_LOGGED_IN_SELECTOR = os.getenv('RAIDBOTS_LOGGED_IN_SELECTOR', "a[href^='/account']")
+RAIDBOTS_SESSION_CHECK_TIMEOUT = 15000  # ms
+RAIDBOTS_IDLE_MINUTES = float(os.getenv('RAIDBOTS_IDLE_MINUTES', '15'))  # keep the browser warm between runs
+# Request filter for the headless Raidbots pages: block resource types the automation
+# never needs (matched by file extension) and known ad/analytics hosts.
+RAIDBOTS_FILTER_REQUESTS = os.getenv('RAIDBOTS_FILTER_REQUESTS', '1') == '1'
+RAIDBOTS_BLOCKED_RESOURCE_TYPES = set(filter(None, os.getenv('RAIDBOTS_BLOCKED_RESOURCE_TYPES', 'image,font,media').split(',')))
+RAIDBOTS_BLOCKED_EXTENSIONS = {
+    'image': ('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico'),
+    'font': ('woff', 'woff2', 'ttf', 'otf'),
+    'media': ('mp4', 'webm', 'mp3', 'ogg'),
+}
+RAIDBOTS_BLOCKED_HOSTS = tuple(filter(None, os.getenv(
+    'RAIDBOTS_BLOCKED_HOSTS',
+    'googletagmanager.com,google-analytics.com,doubleclick.net,googlesyndication.com,'
+    'adservice.google.com,amazon-adsystem.com,facebook.net,hotjar.com,nitropay.com,quantserve.com'
+).split(',')))
+WOW_AUDIT_UPLOAD_CONCURRENCY = int(os.getenv('WOW_AUDIT_UPLOAD_CONCURRENCY', '2'))
+WOW_AUDIT_UPLOAD_RETRIES = 5
+SIM_BOARD_EDIT_INTERVAL = float(os.getenv('SIM_BOARD_EDIT_INTERVAL_SECONDS', '5'))  # min seconds between board edits
+SIM_CONCURRENCY = int(os.getenv('SIM_CONCURRENCY', '3'))  # droptimizers run in parallel
+GEAR_LOOKUP_CONCURRENCY = int(os.getenv('GEAR_LOOKUP_CONCURRENCY', '8'))  # Raider.io gear requests in flight
 headers = {
     'Authorization': f'Bearer {WOW_AUDIT_TOKEN}',  # Only if needed
     'Accept': 'application/json'
 }
 
 
+class RequestFilter:
+    """
+    Blocks non-essential requests through a CDP session (Network.setBlockedURLs) and keeps
+    per-page stats. Unlike page.route this leaves the HTTP cache enabled, so the SPA bundle
+    is fetched once per context instead of on every goto.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.allowed = 0
+        self.cached = 0
+        self.blocked = {}  # reason -> count
+        self.bytes_received = 0
+
+    def blocked_urls(self) -> list:
+        patterns = []
+        for resource_type in RAIDBOTS_BLOCKED_RESOURCE_TYPES:
+            patterns += [f"*.{extension}*" for extension in RAIDBOTS_BLOCKED_EXTENSIONS.get(resource_type, ())]
+        for host in RAIDBOTS_BLOCKED_HOSTS:
+            patterns += [f"*://{host}/*", f"*://*.{host}/*"]
+        return patterns
+
+    def on_loading_finished(self, event):
+        # Sizes arrive with the event, so they are counted before the page's load event
+        self.allowed += 1
+        self.bytes_received += event.get("encodedDataLength", 0)
+
+    def on_served_from_cache(self, event):
+        self.cached += 1
+
+    def on_loading_failed(self, event):
+        if event.get("blockedReason") != "inspector":
+            return
+        resource_type = event.get("type", "").lower()
+        reason = resource_type if resource_type in RAIDBOTS_BLOCKED_RESOURCE_TYPES else "third-party"
+        self.blocked[reason] = self.blocked.get(reason, 0) + 1
+
+    async def attach(self, context, page):
+        session = await context.new_cdp_session(page)
+        session.on("Network.loadingFinished", self.on_loading_finished)
+        session.on("Network.requestServedFromCache", self.on_served_from_cache)
+        session.on("Network.loadingFailed", self.on_loading_failed)
+        await session.send("Network.enable")
+        if RAIDBOTS_FILTER_REQUESTS:
+            await session.send("Network.setBlockedURLs", {"urls": self.blocked_urls()})
+
+    def summary(self, load_seconds: float) -> str:
+        blocked = ", ".join(f"{count} {reason}" for reason, count in self.blocked.items()) or "none"
+        return (
+            f"loaded in {load_seconds:.1f}s, {self.bytes_received / 1024:.0f} KiB over {self.allowed} requests "
+            f"({self.cached} from cache), blocked: {blocked}"
+        )
+
+
+class SimStatusBoard:
+    """
+    One embed showing every character's sim state and percent.
+    Updates only mark the board dirty; it is edited at most once per SIM_BOARD_EDIT_INTERVAL.
+    """
+
+    STATE_EMOJI = {"queued": "⏳", "uploading": "📤", "uploaded": "✅", "failed": "❌"}
+
+    def __init__(self, channel, jobs, running_emoji=None):
+        self.channel = channel
+        self.title = f"Sim run #{jobs[0]['run_id']} - {jobs[0]['raid_name']} {jobs[0]['difficulty']}" if jobs else "Sim run"
+        self.running_emoji = running_emoji or "🔄"
+        self.rows = {
+            job["id"]: {"name": job["character_name"], "state": "queued", "progress": 0, "report_id": None, "error": None}
+            for job in jobs
+        }
+        self.message = None
+        self.dirty = False
+        self.task = None
+
+    def update(self, job_id, state=None, progress=None, report_id=None, error=None):
+        row = self.rows[job_id]
+        if state is not None:
+            row["state"] = state
+        if progress is not None:
+            row["progress"] = progress
+        if report_id is not None:
+            row["report_id"] = report_id
+        if error is not None:
+            row["error"] = error
+        self.dirty = True
+
+    def build_embed(self) -> discord.Embed:
+        lines = []
+        counts = {}
+        for row in self.rows.values():
+            counts[row["state"]] = counts.get(row["state"], 0) + 1
+            if row["state"] == "running":
+                line = f"{self.running_emoji} **{row['name']}** - {row['progress']}%"
+            else:
+                line = f"{self.STATE_EMOJI[row['state']]} **{row['name']}**"
+            if row["report_id"]:
+                line += f" - [report]({RAIDBOTS_REPORT_URL}{row['report_id']})"
+            if row["error"]:
+                line += f" - {row['error'][:80]}"
+            lines.append(line)
+
+        done = counts.get("uploaded", 0) + counts.get("failed", 0)
+        embed = discord.Embed(
+            title=self.title,
+            description="\n".join(lines)[:4000],
+            color=discord.Color.green() if done == len(self.rows) else discord.Color.blue()
+        )
+        embed.set_footer(text=f"{done}/{len(self.rows)} done • " + " • ".join(f"{state}: {count}" for state, count in counts.items()))
+        return embed
+
+    async def start(self):
+        self.message = await self.channel.send(embed=self.build_embed())
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(SIM_BOARD_EDIT_INTERVAL)
+            await self.flush()
+
+    async def flush(self):
+        if not self.dirty or not self.message:
+            return
+        self.dirty = False
+        try:
+            await self.message.edit(embed=self.build_embed())
+        except discord.HTTPException as e:
+            print(f"Failed to update sim status board: {e}")
+            self.dirty = True
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        self.dirty = True
+        await self.flush()
+
+
+async def fetch_gear(char: dict):
+    """Return the character's Raider.io profile with equipped gear, or None if it isn't available."""
+    params = {
+        'region': 'us',
+        'realm': realm_slug(char["realm"]),
+        'name': char["name"],
+        'fields': 'gear'
+    }
+    try:
+        response = await http_client.request("raiderio", "GET", RAIDERIO_PROFILE_URL, params=params)
+    except Exception as e:
+        print(f"Gear lookup failed for {char['name']}: {e}")
+        return None
+    if response.status != 200 or not response.data or not response.data.get("gear", {}).get("items"):
+        return None
+    return response.data
+
+
+def sim_fingerprint(profile: dict | None, difficulty: str, raid_name: str) -> str | None:
+    """
+    Hash of a character's equipped gear and spec plus the sim settings.
+    Returns None when there is no gear to hash, so the character always counts as changed.
+    """
+    if profile is None:
+        return None
+
+    gear = [
+        [
+            slot,
+            item.get("item_id"),
+            item.get("item_level"),
+            sorted(item.get("bonuses") or []),
+            item.get("enchant"),
+            sorted(item.get("gems") or []),
+        ]
+        for slot, item in sorted(profile["gear"]["items"].items())
+    ]
+    payload = json.dumps(
+        {"spec": profile.get("active_spec_name"), "gear": gear, "difficulty": difficulty, "raid": raid_name},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
 class WowAuditSims(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, database):
         self.bot = bot
+        self.db = database
+        self.sim_task = None  # background task for the current /runsims batch
+
+        # Warm browser shared by sim runs, closed after RAIDBOTS_IDLE_MINUTES without work
+        self.playwright = None
+        self.browser = None
+        self.idle_close_task = None
+        self.storage_state = None  # authenticated Raidbots session, persisted in settings
 
     @app_commands.command(name="runsims", description="runs sims for every team member and uploads to wowaudit wishlist")  # Use app_commands
     @app_commands.checks.has_permissions(administrator=True)  # Check for admin permissions
@@ -33,203 +253,451 @@ class WowAuditSims(commands.Cog):
         app_commands.Choice(name="Heroic", value="Heroic"),
         app_commands.Choice(name="Mythic", value="Mythic")
     ])
+    @app_commands.describe(
+        concurrency="How many droptimizers to run at once",
+        force="Sim everyone, even characters whose gear hasn't changed since their last sim"
+    )
     async def run_sims(
-            self,  
+            self,
             interaction: discord.Interaction,
             difficulty: str,
-            raid_name: str):
-        
+            raid_name: str,
+            concurrency: app_commands.Range[int, 1, 8] | None = None,
+            force: bool = False):
+
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("You do not have permission to use this command.", ephemeral=True)
             return
-        
-        response = requests.get(WOW_AUDIT_URL, headers=headers)
+
+        if self.sim_task and not self.sim_task.done():
+            await interaction.response.send_message("A sim batch is already running.", ephemeral=True)
+            return
+
+        # Gear lookups below can take longer than the 3s interaction window
+        await interaction.response.defer()
+
+        response = await http_client.request("wowaudit", "GET", WOW_AUDIT_URL, headers=headers)
         # Handle the response
-        if response.status_code == 200:
-            characters = response.json()
+        if response.status == 200:
+            characters = response.data
             #print(f'JSON HERE ----> {characters}')
         else:
-            print(f"Failed to retrieve data. Status code: {response.status_code}")
+            print(f"Failed to retrieve data. Status code: {response.status}")
             print(response.text)
+            await interaction.followup.send("Failed to fetch the roster from WowAudit.", ephemeral=True)
+            return
         # Filter out characters with role 'healer'
         filtered_characters = [char for char in characters if char.get("role") != "Heal"]
         print(f'JSON HERE ----> {filtered_characters}')
 
+        # Only sim characters whose equipped gear or spec changed since their last uploaded sim.
+        # The WowAudit roster has no gear, so it comes from Raider.io.
+        limiter = asyncio.Semaphore(GEAR_LOOKUP_CONCURRENCY)
+
+        async def lookup(char):
+            async with limiter:
+                return await fetch_gear(char)
+
+        profiles = await asyncio.gather(*[lookup(char) for char in filtered_characters])
+
+        fingerprints = await self.db.get_sim_fingerprints()
+        changed_characters = []
+        no_gear = 0
+        for char, profile in zip(filtered_characters, profiles):
+            fingerprint = sim_fingerprint(profile, difficulty, raid_name)
+            if fingerprint is None:
+                no_gear += 1
+            if force or fingerprint is None or fingerprints.get(char["id"]) != fingerprint:
+                changed_characters.append(dict(char, sim_fingerprint=fingerprint))
+        skipped = len(filtered_characters) - len(changed_characters)
+
+        if not changed_characters:
+            await interaction.followup.send(
+                f"All {len(filtered_characters)} characters have the same gear and spec as at their last sim. Use `force` to sim anyway."
+            )
+            return
 
-        log_channel = interaction.channel
-
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self.start_process, filtered_characters, log_channel, difficulty, raid_name)
-
-    
-    def start_process(self, char_list, log_channel, difficulty, raid_name):
-        def send_log(msg):
-            asyncio.run_coroutine_threadsafe(log_channel.send(msg), self.bot.loop)
-        
-        asyncio.run_coroutine_threadsafe(
-            self.bot.change_presence(activity=discord.Game("Running Sims")),
-            self.bot.loop
-        )
-
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, args=["--no-sandbox"])
-            page = browser.new_page()
-
-            page.goto("https://www.raidbots.com/auth")
-            page.wait_for_selector("input[name='email']", state="visible")
-            page.fill("input[name='email']", EMAIL)
-            page.fill("input[name='password']", PASSWORD)
-            page.click("button:has-text('Login')")
-            page.wait_for_url("https://www.raidbots.com/simbot", timeout=15000)
-            send_log("✅ Logged in and ready to run simulations!")
-
-            # Loop through characters and simulate
-            for char in char_list:
-                #send_log(f"Starting sim for {char['name']}")
-                result = self.run_droptimizer(page, char["realm"], char["name"], char["id"], send_log, log_channel, difficulty, raid_name)
-                sim_string.append(result)
-                #send_log(f"✅ Sim complete for {char['name']} - Report ID: {result['report_id']}")
-
-            browser.close()
-        
-        asyncio.run_coroutine_threadsafe(
-            self.bot.change_presence(activity=discord.Game("Managing Trials")),
-            self.bot.loop
+        concurrency = concurrency or SIM_CONCURRENCY
+        jobs = await self.db.create_sim_jobs(changed_characters, difficulty, raid_name, interaction.channel.id)
+        await interaction.followup.send(
+            f"Starting sim run #{jobs[0]['run_id']} for {len(jobs)} characters ({concurrency} at a time)."
+            + (f" Skipping {skipped} with unchanged gear." if skipped else "")
+            + (f" No Raider.io gear for {no_gear}, simming them anyway." if no_gear else "")
+            + " Use `/simstatus` to follow it."
         )
 
-    def run_droptimizer(self, page, realm, name, id, send_log, log_channel, diff, raid_name):
-        page.goto("https://www.raidbots.com/simbot/droptimizer")
-        page.wait_for_load_state("load")
+        # Run on the bot's event loop in the background so other commands keep working
+        self.sim_task = asyncio.create_task(self.start_process(jobs, interaction.channel, concurrency))
+
+    async def cog_load(self):
+        self.sim_task = asyncio.create_task(self.resume_jobs())
+
+    async def cog_unload(self):
+        if self.sim_task:
+            self.sim_task.cancel()
+        await self.close_browser()
+
+    # ----------------------
+    # Warm browser and persisted Raidbots session
+    # ----------------------
+    async def get_browser(self):
+        """Return the warm browser, launching it if needed."""
+        if self.idle_close_task:
+            self.idle_close_task.cancel()
+            self.idle_close_task = None
+
+        if self.browser is None or not self.browser.is_connected():
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(headless=True, args=["--no-sandbox"])
+        return self.browser
+
+    async def close_browser(self):
+        if self.browser:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+            self.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+    async def close_when_idle(self):
+        await asyncio.sleep(RAIDBOTS_IDLE_MINUTES * 60)
+        print("Closing idle Raidbots browser")
+        await self.close_browser()
+
+    async def session_is_valid(self, browser) -> bool:
+        """Check whether the stored session is still signed in to Raidbots."""
+        context = await browser.new_context(storage_state=self.storage_state)
+        try:
+            page = await context.new_page()
+            await page.goto("https://www.raidbots.com/simbot")
+            # The header's signed-in state renders after the session XHR, not on "load";
+            # a signed-out page never shows the account link, so a timeout means invalid.
+            await page.wait_for_selector(RAIDBOTS_LOGGED_IN_SELECTOR, state="attached", timeout=RAIDBOTS_SESSION_CHECK_TIMEOUT)
+            return True
+        except Exception as e:
+            print(f"Raidbots session check failed: {e}")
+            return False
+        finally:
+            await context.close()
+
+    async def login(self, browser):
+        """Log in with email/password and return the authenticated storage state."""
+        context = await browser.new_context()
+        try:
+            page = await context.new_page()
+            await page.goto("https://www.raidbots.com/auth")
+            await page.wait_for_selector("input[name='email']", state="visible")
+            await page.fill("input[name='email']", EMAIL)
+            await page.fill("input[name='password']", PASSWORD)
+            await page.click("button:has-text('Login')")
+            await page.wait_for_url("https://www.raidbots.com/simbot", timeout=15000)
+            return await context.storage_state()
+        finally:
+            await context.close()
+
+    async def get_session(self, browser, send_log):
+        """Reuse the saved session, logging in again only when Raidbots rejects it."""
+        if self.storage_state is None:
+            saved = await self.db.get_raidbots_session()
+            self.storage_state = json.loads(saved) if saved else None
+
+        if self.storage_state and await self.session_is_valid(browser):
+            return self.storage_state
+
+        self.storage_state = await self.login(browser)
+        await self.db.set_raidbots_session(json.dumps(self.storage_state))
+        await send_log("✅ Logged in and ready to run simulations!")
+        return self.storage_state
+
+    async def resume_jobs(self):
+        """Pick up jobs of the latest run that a restart interrupted; jobs left 'running' are simply run again."""
+        await self.bot.wait_until_ready()
+        jobs = await self.db.get_unfinished_sim_jobs()
+        if not jobs:
+            return
 
-        page.wait_for_selector("div#ArmoryInput-armoryRealm:visible", timeout=10000)
-        page.click("div#ArmoryInput-armoryRealm input")  # Click the input inside the div
+        log_channel = self.bot.get_channel(jobs[0]["channel_id"])
+        if log_channel is None:
+            print(f"Resuming {len(jobs)} sim jobs, but their log channel is gone.")
+            return
+        await log_channel.send(f"♻️ Resuming {len(jobs)} unfinished sim job(s) after a restart.")
+        await self.start_process(jobs, log_channel)
+
+    # ----------------------
+    # /simstatus
+    # ----------------------
+    @app_commands.command(name="simstatus", description="Show the state of the latest sim run")
+    async def sim_status(self, interaction: discord.Interaction):
+        jobs = await self.db.get_sim_run()
+        if not jobs:
+            await interaction.response.send_message("No sims have been run yet.", ephemeral=True)
+            return
 
-        page.keyboard.type(realm)
-        page.keyboard.press("Enter")
-        page.fill("input#ArmoryInput-armorySearch", name)
+        state_emoji = {"queued": "⏳", "running": "🔄", "uploaded": "✅", "failed": "❌"}
+        counts = {}
+        lines = []
+        for job in jobs:
+            counts[job["state"]] = counts.get(job["state"], 0) + 1
+            line = f"{state_emoji[job['state']]} **{job['character_name']}**"
+            if job["report_id"]:
+                line += f" - [report]({RAIDBOTS_REPORT_URL}{job['report_id']})"
+            if job["started_at"] and job["finished_at"]:
+                elapsed = datetime.fromisoformat(job["finished_at"]) - datetime.fromisoformat(job["started_at"])
+                line += f" ({int(elapsed.total_seconds()) // 60}m {int(elapsed.total_seconds()) % 60}s)"
+            if job["error"]:
+                line += f" - {job['error'][:80]}"
+            lines.append(line)
+
+        embed = discord.Embed(
+            title=f"Sim run #{jobs[0]['run_id']} - {jobs[0]['raid_name']} {jobs[0]['difficulty']}",
+            description="\n".join(lines)[:4000],
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=" • ".join(f"{state}: {count}" for state, count in counts.items()))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+    async def start_process(self, jobs, log_channel, concurrency=SIM_CONCURRENCY):
+        async def send_log(msg):
+            await log_channel.send(msg)
+
+        await self.bot.change_presence(activity=discord.Game("Running Sims"))
+
+        board = SimStatusBoard(log_channel, jobs, discord.utils.get(self.bot.emojis, name="timerReverb"))
+        await board.start()
+
+        # Uploads are their own stage: sim workers hand finished reports to the
+        # upload queue and move straight on to the next character.
+        upload_queue = asyncio.Queue()
+        upload_stats = {"uploaded": 0, "failed": 0, "retries": 0}
+        uploaders = []
+
+        try:
+            uploaders = [
+                asyncio.create_task(self.upload_worker(upload_queue, upload_stats, board))
+                for _ in range(WOW_AUDIT_UPLOAD_CONCURRENCY)
+            ]
+
+            job_queue = asyncio.Queue()
+            for job in jobs:
+                if job["report_id"]:
+                    # Interrupted after its sim finished, only the upload is left
+                    board.update(job["id"], "uploading", report_id=job["report_id"])
+                    upload_queue.put_nowait((job, job["report_id"]))
+                else:
+                    job_queue.put_nowait(job)
+
+            if not job_queue.empty():
+                browser = await self.get_browser()
+                storage_state = await self.get_session(browser, send_log)
+
+                workers = max(1, min(concurrency, job_queue.qsize()))
+                await asyncio.gather(*[
+                    self.sim_worker(browser, job_queue, upload_queue, storage_state, board)
+                    for _ in range(workers)
+                ])
+
+            await upload_queue.join()
+            await send_log(
+                f"📦 Upload summary: {upload_stats['uploaded']} uploaded, {upload_stats['failed']} failed, "
+                f"{upload_stats['retries']} retries."
+            )
+        except Exception as e:
+            print(f"Sim run failed: {e}")
+            # Don't leave the rest of the run queued for a resume weeks later
+            failed_ids = await self.db.fail_unfinished_sim_jobs(jobs[0]["run_id"], f"run aborted: {e}")
+            for job_id in failed_ids:
+                board.update(job_id, "failed", error=f"run aborted: {e}")
+            await send_log(f"❌ Sim run failed: {e}")
+        finally:
+            for uploader in uploaders:
+                uploader.cancel()
+            await board.stop()
+            self.idle_close_task = asyncio.create_task(self.close_when_idle())
+            await self.bot.change_presence(activity=discord.Game("Managing Trials"))
+
+    async def sim_worker(self, browser, job_queue, upload_queue, storage_state, board):
+        """Pull jobs off the queue until it is empty; one failure never stops the worker."""
+        context = await browser.new_context(storage_state=storage_state)
+        request_filter = RequestFilter()
+        page = await context.new_page()
+        await request_filter.attach(context, page)
+
+        try:
+            while True:
+                try:
+                    job = job_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
 
-        time.sleep(5)
+                await self.db.start_sim_job(job["id"])
+                board.update(job["id"], "running", progress=0)
+                try:
+                    rep_id = await self.run_droptimizer(
+                        page, job["realm"], job["character_name"], job["difficulty"], job["raid_name"],
+                        lambda percent, job_id=job["id"]: board.update(job_id, progress=percent),
+                        request_filter
+                    )
+                    await self.db.set_sim_job_report(job["id"], rep_id)
+                    board.update(job["id"], "uploading", report_id=rep_id)
+                    await upload_queue.put((job, rep_id))
+                except Exception as e:
+                    print(f"Sim failed for {job['character_name']}: {e}")
+                    await self.db.finish_sim_job(job["id"], "failed", str(e))
+                    board.update(job["id"], "failed", error=f"sim: {e}")
+                    # Start the next character on a clean page
+                    await page.close()
+                    page = await context.new_page()
+                    await request_filter.attach(context, page)
+        finally:
+            await context.close()
+
+    async def upload_worker(self, upload_queue, upload_stats, board):
+        """Drain the upload queue until cancelled."""
+        while True:
+            job, rep_id = await upload_queue.get()
+            try:
+                await self.upload_wishlist(job, rep_id, upload_stats)
+                await self.db.finish_sim_job(job["id"], "uploaded")
+                upload_stats["uploaded"] += 1
+                board.update(job["id"], "uploaded")
+            except Exception as e:
+                print(f"Upload failed for {job['character_name']}: {e}")
+                await self.db.finish_sim_job(job["id"], "failed", str(e))
+                upload_stats["failed"] += 1
+                board.update(job["id"], "failed", error=f"upload: {e}")
+            finally:
+                upload_queue.task_done()
+
+    async def run_droptimizer(self, page, realm, name, diff, raid_name, on_progress, request_filter=None):
+        """Run one droptimizer and return its Raidbots report id. on_progress(percent) is called as the job advances."""
+        if request_filter:
+            request_filter.reset()
+        load_started = time.monotonic()
+        await page.goto("https://www.raidbots.com/simbot/droptimizer")
+        await page.wait_for_load_state("load")
+        if request_filter:
+            print(f"Droptimizer page for {name}: {request_filter.summary(time.monotonic() - load_started)}")
+
+        await page.wait_for_selector("div#ArmoryInput-armoryRealm:visible", timeout=10000)
+        await page.click("div#ArmoryInput-armoryRealm input")  # Click the input inside the div
+
+        await page.keyboard.type(realm)
+        await page.keyboard.press("Enter")
+        await page.fill("input#ArmoryInput-armorySearch", name)
+
+        await asyncio.sleep(5)
 
         element = page.locator("text=" + raid_name).first
-        element.scroll_into_view_if_needed()
-        element.click()
+        await element.scroll_into_view_if_needed()
+        await element.click()
 
         if diff == "Heroic":
             element = page.locator("text=" + diff).first
-            element.scroll_into_view_if_needed()
-            element.click()
+            await element.scroll_into_view_if_needed()
+            await element.click()
 
         dropdowns = page.locator("div[class*='css-hlgwow']")
         second_dropdown = dropdowns.nth(1)
 
         # Click to open the second dropdown
-        second_dropdown.click()
+        await second_dropdown.click()
 
         # Wait for the options to appear
-        page.wait_for_selector("div[id^='react-select'][id$='-listbox'] div", timeout=5000)
+        await page.wait_for_selector("div[id^='react-select'][id$='-listbox'] div", timeout=5000)
 
         # Click the second option
-        page.locator("div[id^='react-select'][id$='-listbox'] div").nth(2).click()
-
-        page.locator("input[name='upgradeEquipped']").check(force=True)
+        await page.locator("div[id^='react-select'][id$='-listbox'] div").nth(2).click()
 
-        #time.sleep(10)
-        page.click("button:has-text('Run Droptimizer')")
+        await page.locator("input[name='upgradeEquipped']").check(force=True)
 
-        future_msg = asyncio.run_coroutine_threadsafe(
-            log_channel.send(f"Running simulation for {name}: 0%"), self.bot.loop
-        )
-        progress_message = future_msg.result()  # get the Discord message object
-
-        progress_span = page.locator("div.Donut > span").first
-        total_stages = 3
-        current_stage = 0
-        last_overall_progress = -1
-        last_stage_progress = 0
+        # Follow the job through the SPA's own API traffic instead of polling the DOM:
+        # the submit response carries the sim id and the job status polls carry progress/state.
+        job = {"sim_id": None, "state": None, "progress": 0}
+        job_updated = asyncio.Event()
 
-        while True:
+        async def on_response(response):
+            path = urlparse(response.url).path
             try:
-
-                #print(f'first try')
-                
-                try:
-                    #print(f'second try')
-                    page.wait_for_selector("text=Boss Summary", timeout=1000)  # 1 second
-                    # If found, break
-                    break
-                except:
-                    pass
-
-                raw_text = progress_span.text_content().strip()  # should return something like '25%'
-                stage_progress = "".join(filter(str.isdigit, raw_text))
-                stage_progress = int(stage_progress) if stage_progress else 0
-
-                if stage_progress < last_stage_progress and current_stage < total_stages - 1:
-                    current_stage += 1
-
-
-                last_stage_progress = stage_progress
-
-                overall_progress = int(((current_stage + stage_progress / 100) / total_stages) * 100)
-
-                if overall_progress != last_overall_progress:
-                    #print(f'if hehe')
-                    last_overall_progress   = overall_progress
-                    emoji = discord.utils.get(self.bot.emojis, name="timerReverb")
-                    asyncio.run_coroutine_threadsafe(
-                        progress_message.edit(content=f"{emoji} Running simulation for {name}: {overall_progress}%"),
-                        self.bot.loop
-                    )
-
-                try:
-                    print(f'second try')
-                    page.wait_for_selector("text=Boss Summary", timeout=1000)  # 1 second
-                    # If found, break
-                    break
-                except:
-                    pass
-
-                        # Break when sim is done
-                if overall_progress > 95:
-                    break
-
+                if response.request.method == "POST" and path == RAIDBOTS_SIM_SUBMIT_PATH:
+                    data = await response.json()
+                    job["sim_id"] = data.get("simId")
+                    job_updated.set()
+                elif job["sim_id"] and path == RAIDBOTS_JOB_STATUS_PATH + job["sim_id"]:
+                    data = await response.json()
+                    status = data.get("job", data)
+                    job["state"] = status.get("state")
+                    job["progress"] = int(status.get("progress") or job["progress"])
+                    job_updated.set()
+                elif job["sim_id"] and path.startswith(RAIDBOTS_REPORT_DATA_PATH + job["sim_id"] + "/"):
+                    # The SPA only loads report data once the job is done
+                    if response.ok:
+                        job["state"] = "complete"
+                        job_updated.set()
             except Exception as e:
-                print(f"Progress loop error: {e}")
-
-            time.sleep(2)
-
-        # Final edit to show completion
-        asyncio.run_coroutine_threadsafe(
-            progress_message.edit(content=f"✅ Simulation finished for {name}!"),
-            self.bot.loop
-        )
-
-
-        page.wait_for_selector("text=Boss Summary", timeout=900000)  # Wait up to 15 minutes
-        rep_id = page.url.split("/")[-1]
-        send_log(f"✅ {name} - Report URL: {page.url}")
-        print("Result URL:", page.url)
-        print()
-
-        
-
+                print(f"Could not read Raidbots response {response.url}: {e}")
+
+        async def track_job():
+            last_progress = -1
+            while True:
+                await job_updated.wait()
+                job_updated.clear()
+
+                if job["state"] == "complete":
+                    return
+                if job["state"] == "failed":
+                    raise RuntimeError(f"Raidbots job {job['sim_id']} failed")
+
+                if job["progress"] != last_progress:
+                    last_progress = job["progress"]
+                    on_progress(last_progress)
+
+        page.on("response", on_response)
+        try:
+            await page.click("button:has-text('Run Droptimizer')")
+            await asyncio.wait_for(track_job(), timeout=900)  # Wait up to 15 minutes
+        finally:
+            page.remove_listener("response", on_response)
+
+        if not job["sim_id"]:
+            raise RuntimeError("Raidbots did not return a sim id")
+
+        rep_id = job["sim_id"]
+        print(f"Result URL for {name}: {RAIDBOTS_REPORT_URL}{rep_id}")
+
+        return rep_id
+
+    async def upload_wishlist(self, job, rep_id, upload_stats):
+        """
+        Send a finished report to the WowAudit wishlist.
+        The shared client retries 429/5xx with backoff; raises if the upload still fails.
+        """
         body = {
             "report_id": rep_id,
-            "character_id": id,
-            "character_name": name,
+            "character_id": job["character_id"],
+            "character_name": job["character_name"],
             "configuration_name": "Single Target",
             "replace_manual_edits": True,
             "clear_conduits": True
         }
 
-        response2 = requests.post(WOW_AUDIT_UPLOAD_URL, headers=headers, json=body)
-        # Handle the response
-        if response2.status_code == 200 or response2.status_code == 201:
-            send_log(f"✅ Successfully updated WowAudit for {body['character_name']}")
-        else:
-            send_log(f"Failed to retrieve data. Status code: {response2.status_code}")
-            send_log(response2.text)
+        def count_retry():
+            upload_stats["retries"] += 1
+
+        response = await http_client.request(
+            "wowaudit", "POST", WOW_AUDIT_UPLOAD_URL,
+            headers=headers, json=body, retries=WOW_AUDIT_UPLOAD_RETRIES, on_retry=count_retry
+        )
+        if response.status != 200 and response.status != 201:
+            raise RuntimeError(f"WowAudit upload failed with status {response.status}: {response.text[:200]}")
+
+        if job["fingerprint"]:
+            await self.db.set_sim_fingerprint(job["character_id"], job["fingerprint"], rep_id)
+
+async def setup(bot, database):
+    await bot.add_cog(WowAuditSims(bot, database))
 
-async def setup(bot):
-    await bot.add_cog(WowAuditSims(bot))
-    
\ No newline at end of file
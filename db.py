@@ -1,4 +1,5 @@
 import aiosqlite
+import asyncio
 import os
 import datetime
 from datetime import timezone
@@ -8,6 +9,7 @@ class Database:
     def __init__(self, db_path: str = "/app/reverb_bot.db"): #/app/reverb_bot.db change to reverb_bot.db for local testing
         self.db_path = db_path
         self.conn = None
+        self.write_lock = asyncio.Lock()  # held by every write that commits on the shared connection
 
     async def connect(self):
         """Connect to SQLite database and create tables if they don't exist."""
@@ -66,6 +68,12 @@ class Database:
             )
         """)
 
+        # get_gold_balance sums the ledger per user
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_gold_ledger_user
+            ON gold_ledger (user_id)
+        """)
+
         # Create bets table
         await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS bets (
@@ -93,6 +101,12 @@ class Database:
             )
         """)
 
+        # Pending queue is read oldest-first and paged by (requested_at, id)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_payout_requests_status_requested
+            ON payout_requests (status, requested_at, id)
+        """)
+
 
                 # Create lotteries table
         await self.conn.execute("""
@@ -108,6 +122,12 @@ class Database:
             )
         """)
 
+        # get_active_lotteries filters on status and sorts by start_time
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_lotteries_status_start
+            ON lotteries (status, start_time)
+        """)
+
         # Create lottery_tickets table
         await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS lottery_tickets (
@@ -119,6 +139,12 @@ class Database:
             )
         """)
 
+        # Per-user ticket counts for the purchase cap
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_lottery_tickets_lottery_user
+            ON lottery_tickets (lottery_id, user_id)
+        """)
+
         # Create lottery_winners table
         await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS lottery_winners (
@@ -131,6 +157,62 @@ class Database:
             )
         """)
         
+        # Fingerprint of each character's Raider.io equipped gear + spec, difficulty and raid at their last uploaded sim
+        # (the WowAudit roster record has no gear, so it must not be what gets hashed)
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sim_fingerprints (
+                character_id INTEGER PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                report_id TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # One row per character per /runsims batch, so batches survive restarts
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sim_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id INTEGER NOT NULL,
+                character_id INTEGER NOT NULL,
+                character_name TEXT NOT NULL,
+                realm TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                raid_name TEXT NOT NULL,
+                fingerprint TEXT,
+                channel_id INTEGER,
+                state TEXT NOT NULL CHECK(state IN ('queued','running','uploaded','failed')),
+                report_id TEXT,
+                error TEXT,
+                queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        """)
+        await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sim_jobs_state ON sim_jobs (state)")
+        await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sim_jobs_run ON sim_jobs (run_id)")
+        
+        # Raider.io raid static data per expansion, with validators for conditional requests
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS raid_static_data (
+                expansion_id INTEGER PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                data TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                reconciled_hash TEXT,
+                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Raider.io character profiles, so lookups survive restarts
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS raiderio_profiles (
+                cache_key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        
         # Insert default settings if table is empty
         cursor = await self.conn.execute("SELECT COUNT(*) FROM settings")
         count = await cursor.fetchone()
@@ -139,9 +221,27 @@ class Database:
                 INSERT INTO settings (id, expansion_id) 
                 VALUES (1, NULL)
             """)
+
+        # Columns added after the first release
+        await self._add_column_if_missing("settings", "ledger_dashboard_channel_id", "INTEGER")
+        await self._add_column_if_missing("settings", "ledger_dashboard_message_id", "INTEGER")
+        await self._add_column_if_missing("settings", "raidbots_session", "TEXT")
+        await self._add_column_if_missing("lotteries", "tier", "TEXT NOT NULL DEFAULT 'standard'")
+        await self._add_column_if_missing("lotteries", "max_tickets", "INTEGER NOT NULL DEFAULT 20")
+        await self._add_column_if_missing("payout_requests", "character", "TEXT")
+        await self._add_column_if_missing("payout_requests", "server", "TEXT")
+        await self._add_column_if_missing("payout_requests", "channel_id", "INTEGER")
+        await self._add_column_if_missing("payout_requests", "message_id", "INTEGER")
         
         await self.conn.commit()
 
+    async def _add_column_if_missing(self, table: str, column: str, definition: str):
+        """Add a column to an existing table (SQLite has no ADD COLUMN IF NOT EXISTS)."""
+        cursor = await self.conn.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in await cursor.fetchall()]
+        if column not in columns:
+            await self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
     async def close(self):
         """Close the database connection."""
         if self.conn:
@@ -158,22 +258,24 @@ class Database:
 
     async def set_trial_thread(self, user_id: int, thread_id: int):
         """Set or update the thread_id for a given user_id."""
-        await self.conn.execute(
-            """
-            INSERT OR REPLACE INTO trial_threads (user_id, thread_id)
-            VALUES (?, ?)
-            """,
-            (user_id, thread_id)
-        )
-        await self.conn.commit()
+        async with self.write_lock:
+            await self.conn.execute(
+                """
+                INSERT OR REPLACE INTO trial_threads (user_id, thread_id)
+                VALUES (?, ?)
+                """,
+                (user_id, thread_id)
+            )
+            await self.conn.commit()
 
     async def delete_trial_thread(self, user_id: int):
         """Delete the trial thread entry for a given user_id."""
-        await self.conn.execute(
-            "DELETE FROM trial_threads WHERE user_id = ?",
-            (user_id,)
-        )
-        await self.conn.commit()
+        async with self.write_lock:
+            await self.conn.execute(
+                "DELETE FROM trial_threads WHERE user_id = ?",
+                (user_id,)
+            )
+            await self.conn.commit()
 
     async def get_welcome_message(self):
         """Get the welcome message."""
@@ -183,11 +285,12 @@ class Database:
         
     async def set_welcome_message(self, welcome_message: str):
         """Update the welcome message."""
-        await self.conn.execute(
-            "UPDATE welcome_message SET message = ? WHERE id = 1",
-            (welcome_message,)
-        )
-        await self.conn.commit()
+        async with self.write_lock:
+            await self.conn.execute(
+                "UPDATE welcome_message SET message = ? WHERE id = 1",
+                (welcome_message,)
+            )
+            await self.conn.commit()
 
     async def get_expansion_id(self):
         """Get the expansion_id from settings."""
@@ -197,14 +300,241 @@ class Database:
 
     async def set_expansion_id(self, expansion_id: int):
         """Update the expansion_id in settings."""
-        await self.conn.execute(
-            "UPDATE settings SET expansion_id = ? WHERE id = 1",
-            (expansion_id,)
+        async with self.write_lock:
+            await self.conn.execute(
+                "UPDATE settings SET expansion_id = ? WHERE id = 1",
+                (expansion_id,)
+            )
+            await self.conn.commit()
+
+
+    async def get_ledger_dashboard(self):
+        """Return (channel_id, message_id) of the pinned ledger dashboard, or None."""
+        cursor = await self.conn.execute(
+            "SELECT ledger_dashboard_channel_id, ledger_dashboard_message_id FROM settings WHERE id = 1"
         )
-        await self.conn.commit()
+        result = await cursor.fetchone()
+        if not result or not result[0] or not result[1]:
+            return None
+        return result[0], result[1]
+
+    async def set_ledger_dashboard(self, channel_id: int | None, message_id: int | None):
+        """Store (or clear) the pinned ledger dashboard message."""
+        async with self.write_lock:
+            await self.conn.execute(
+                "UPDATE settings SET ledger_dashboard_channel_id = ?, ledger_dashboard_message_id = ? WHERE id = 1",
+                (channel_id, message_id)
+            )
+            await self.conn.commit()
 
     
 
+    #-----------------sim helpers-----------------
+
+    async def get_raidbots_session(self):
+        """Return the saved Raidbots browser storage state (JSON text), or None."""
+        cursor = await self.conn.execute("SELECT raidbots_session FROM settings WHERE id = 1")
+        result = await cursor.fetchone()
+        return result[0] if result else None
+
+    async def set_raidbots_session(self, storage_state: str | None):
+        """Save (or clear) the Raidbots browser storage state."""
+        async with self.write_lock:
+            await self.conn.execute(
+                "UPDATE settings SET raidbots_session = ? WHERE id = 1",
+                (storage_state,)
+            )
+            await self.conn.commit()
+
+    async def get_sim_fingerprints(self) -> dict:
+        """Return {character_id: fingerprint} for every character simmed before."""
+        cursor = await self.conn.execute("SELECT character_id, fingerprint FROM sim_fingerprints")
+        return {row[0]: row[1] for row in await cursor.fetchall()}
+
+    async def set_sim_fingerprint(self, character_id: int, fingerprint: str, report_id: str | None = None):
+        """Record the fingerprint a character was last simmed and uploaded with."""
+        async with self.write_lock:
+            await self.conn.execute(
+                """
+                INSERT OR REPLACE INTO sim_fingerprints (character_id, fingerprint, report_id, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (character_id, fingerprint, report_id)
+            )
+            await self.conn.commit()
+
+
+    SIM_JOB_COLUMNS = (
+        "id", "run_id", "character_id", "character_name", "realm", "difficulty", "raid_name",
+        "fingerprint", "channel_id", "state", "report_id", "error", "queued_at", "started_at", "finished_at"
+    )
+
+    async def _fetch_sim_jobs(self, where: str, params: tuple = ()):
+        cursor = await self.conn.execute(
+            f"SELECT {', '.join(self.SIM_JOB_COLUMNS)} FROM sim_jobs WHERE {where} ORDER BY id",
+            params
+        )
+        return [dict(zip(self.SIM_JOB_COLUMNS, row)) for row in await cursor.fetchall()]
+
+    async def create_sim_jobs(self, characters: list, difficulty: str, raid_name: str, channel_id: int | None):
+        """Queue one job per character as a new run and return the run's jobs."""
+        async with self.write_lock:
+            cursor = await self.conn.execute("SELECT COALESCE(MAX(run_id), 0) + 1 FROM sim_jobs")
+            run_id = (await cursor.fetchone())[0]
+            await self.conn.executemany(
+                """
+                INSERT INTO sim_jobs (run_id, character_id, character_name, realm, difficulty, raid_name, fingerprint, channel_id, state)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued')
+                """,
+                [
+                    (run_id, char["id"], char["name"], char["realm"], difficulty, raid_name, char.get("sim_fingerprint"), channel_id)
+                    for char in characters
+                ]
+            )
+            await self.conn.commit()
+        return await self._fetch_sim_jobs("run_id = ?", (run_id,))
+
+    async def get_unfinished_sim_jobs(self):
+        """Return queued and running jobs of the latest run (running ones were interrupted by a restart)."""
+        return await self._fetch_sim_jobs(
+            "state IN ('queued', 'running') AND run_id = (SELECT MAX(run_id) FROM sim_jobs)"
+        )
+
+    async def fail_unfinished_sim_jobs(self, run_id: int, error: str) -> list:
+        """Mark every queued or running job of a run as failed; returns their ids."""
+        async with self.write_lock:
+            cursor = await self.conn.execute(
+                "SELECT id FROM sim_jobs WHERE run_id = ? AND state IN ('queued', 'running')",
+                (run_id,)
+            )
+            job_ids = [row[0] for row in await cursor.fetchall()]
+            await self.conn.execute(
+                """
+                UPDATE sim_jobs SET state = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE run_id = ? AND state IN ('queued', 'running')
+                """,
+                (error, run_id)
+            )
+            await self.conn.commit()
+        return job_ids
+
+    async def get_sim_run(self, run_id: int | None = None):
+        """Return every job of a run, defaulting to the latest run."""
+        if run_id is None:
+            cursor = await self.conn.execute("SELECT MAX(run_id) FROM sim_jobs")
+            run_id = (await cursor.fetchone())[0]
+            if run_id is None:
+                return []
+        return await self._fetch_sim_jobs("run_id = ?", (run_id,))
+
+    async def start_sim_job(self, job_id: int):
+        async with self.write_lock:
+            await self.conn.execute(
+                "UPDATE sim_jobs SET state = 'running', started_at = CURRENT_TIMESTAMP, error = NULL WHERE id = ?",
+                (job_id,)
+            )
+            await self.conn.commit()
+
+    async def set_sim_job_report(self, job_id: int, report_id: str):
+        async with self.write_lock:
+            await self.conn.execute("UPDATE sim_jobs SET report_id = ? WHERE id = ?", (report_id, job_id))
+            await self.conn.commit()
+
+    async def finish_sim_job(self, job_id: int, state: str, error: str | None = None):
+        """Mark a job as 'uploaded' or 'failed'."""
+        async with self.write_lock:
+            await self.conn.execute(
+                "UPDATE sim_jobs SET state = ?, error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (state, error, job_id)
+            )
+            await self.conn.commit()
+
+    
+
+    #-----------------raider.io cache helpers-----------------
+
+    async def get_raid_static_data(self, expansion_id: int):
+        """Return the stored static data row for an expansion as a dict, or None."""
+        cursor = await self.conn.execute(
+            """
+            SELECT etag, last_modified, data, content_hash, reconciled_hash
+            FROM raid_static_data
+            WHERE expansion_id = ?
+            """,
+            (expansion_id,)
+        )
+        row = await cursor.fetchone()
+        if not row:
+            return None
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "data": row[2],
+            "content_hash": row[3],
+            "reconciled_hash": row[4],
+        }
+
+    async def set_raid_static_data(self, expansion_id: int, etag: str | None, last_modified: str | None,
+                                   data: str, content_hash: str):
+        """Store a freshly downloaded static data payload, keeping the last reconciled hash."""
+        async with self.write_lock:
+            await self.conn.execute(
+                """
+                INSERT INTO raid_static_data (expansion_id, etag, last_modified, data, content_hash, fetched_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(expansion_id) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    data = excluded.data,
+                    content_hash = excluded.content_hash,
+                    fetched_at = excluded.fetched_at
+                """,
+                (expansion_id, etag, last_modified, data, content_hash)
+            )
+            await self.conn.commit()
+
+    async def set_raid_static_data_reconciled(self, expansion_id: int, content_hash: str):
+        """Record that the channels were reconciled against this payload."""
+        async with self.write_lock:
+            await self.conn.execute(
+                "UPDATE raid_static_data SET reconciled_hash = ? WHERE expansion_id = ?",
+                (content_hash, expansion_id)
+            )
+            await self.conn.commit()
+
+    async def get_raiderio_profile(self, cache_key: str):
+        """Return (data_json, fetched_at) for a cached profile, or None."""
+        cursor = await self.conn.execute(
+            "SELECT data, fetched_at FROM raiderio_profiles WHERE cache_key = ?",
+            (cache_key,)
+        )
+        return await cursor.fetchone()
+
+    async def set_raiderio_profile(self, cache_key: str, data: str, fetched_at: float):
+        """Store a profile payload (JSON text) with the unix time it was fetched."""
+        async with self.write_lock:
+            await self.conn.execute(
+                "INSERT OR REPLACE INTO raiderio_profiles (cache_key, data, fetched_at) VALUES (?, ?, ?)",
+                (cache_key, data, fetched_at)
+            )
+            await self.conn.commit()
+
+    async def get_raiderio_profile_keys(self) -> list:
+        """Return every cached profile key ('region:realm:name:fields')."""
+        cursor = await self.conn.execute("SELECT cache_key FROM raiderio_profiles")
+        return [row[0] for row in await cursor.fetchall()]
+
+    async def prune_raiderio_profiles(self, older_than: float) -> int:
+        """Delete profiles fetched before the given unix time; returns how many were removed."""
+        async with self.write_lock:
+            cursor = await self.conn.execute(
+                "DELETE FROM raiderio_profiles WHERE fetched_at < ?",
+                (older_than,)
+            )
+            await self.conn.commit()
+            return cursor.rowcount
+
+
     #-----------------gamba helpers-----------------
 
     async def get_gold_balance(self, user_id: int) -> int:
@@ -227,19 +557,28 @@ class Database:
         amount: int,
         reason: str,
         reference_id: str | None = None,
-        officer_id: int | None = None
+        officer_id: int | None = None,
+        commit: bool = True
     ):
-        """Add a gold ledger entry (credit, bet, win, loss, payout)."""
-        await self.conn.execute(
-            """
+        """Add a gold ledger entry (credit, bet, win, loss, payout).
+
+        Pass commit=False when the entry is part of a larger transaction;
+        the caller must already hold write_lock.
+        """
+        sql = """
             INSERT INTO gold_ledger (
                 user_id, amount, reason, reference_id, officer_id
             )
             VALUES (?, ?, ?, ?, ?)
-            """,
-            (user_id, amount, reason, reference_id, officer_id)
-        )
-        await self.conn.commit()
+        """
+        params = (user_id, amount, reason, reference_id, officer_id)
+        if not commit:
+            await self.conn.execute(sql, params)
+            return
+
+        async with self.write_lock:
+            await self.conn.execute(sql, params)
+            await self.conn.commit()
 
 
     async def credit_gold(
@@ -268,64 +607,88 @@ class Database:
         payout: int
     ) -> int:
         """
-        Record a bet and apply gold changes.
+        Record a bet and apply gold changes in a single transaction.
         Returns bet_id.
         """
         if wager <= 0:
             raise ValueError("Wager must be positive")
 
-        balance = await self.get_gold_balance(user_id)
-        if balance < wager:
-            raise ValueError("Insufficient balance")
-
-        # Create bet record
-        cursor = await self.conn.execute(
-            """
-            INSERT INTO bets (user_id, game, wager, outcome, payout)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (user_id, game, wager, outcome, payout)
-        )
-        bet_id = cursor.lastrowid
-
-        # Deduct wager
-        await self.add_ledger_entry(
-            user_id=user_id,
-            amount=-wager,
-            reason="bet",
-            reference_id=f"bet:{bet_id}"
-        )
-
-        # Apply payout if win
-        if payout > 0:
-            await self.add_ledger_entry(
-                user_id=user_id,
-                amount=payout,
-                reason="win",
-                reference_id=f"bet:{bet_id}"
-            )
+        async with self.write_lock:
+            balance = await self.get_gold_balance(user_id)
+            if balance < wager:
+                raise ValueError("Insufficient balance")
+
+            try:
+                # Create bet record
+                cursor = await self.conn.execute(
+                    """
+                    INSERT INTO bets (user_id, game, wager, outcome, payout)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (user_id, game, wager, outcome, payout)
+                )
+                bet_id = cursor.lastrowid
+
+                # Deduct wager
+                await self.add_ledger_entry(
+                    user_id=user_id,
+                    amount=-wager,
+                    reason="bet",
+                    reference_id=f"bet:{bet_id}",
+                    commit=False
+                )
+
+                # Apply payout if win
+                if payout > 0:
+                    await self.add_ledger_entry(
+                        user_id=user_id,
+                        amount=payout,
+                        reason="win",
+                        reference_id=f"bet:{bet_id}",
+                        commit=False
+                    )
+                await self.conn.commit()
+            except Exception:
+                await self.conn.rollback()
+                raise
 
         return bet_id
 
     
-    async def create_payout_request(self, user_id: int, amount: int) -> int:
-        """Create a payout request if user has enough balance."""
+    async def create_payout_request(
+        self,
+        user_id: int,
+        amount: int,
+        character: str | None = None,
+        server: str | None = None
+    ) -> int:
+        """Create a payout request to character-server if user has enough balance."""
         if amount <= 0:
             raise ValueError("Payout amount must be positive")
 
-        balance = await self.get_gold_balance(user_id)
-        if balance < amount:
-            raise ValueError("Insufficient balance")
+        async with self.write_lock:
+            balance = await self.get_gold_balance(user_id)
+            if balance < amount:
+                raise ValueError("Insufficient balance")
+
+            cursor = await self.conn.execute(
+                """
+                INSERT INTO payout_requests (user_id, amount, status, character, server)
+                VALUES (?, ?, 'pending', ?, ?)
+                """,
+                (user_id, amount, character, server)
+            )
+            await self.conn.commit()
+            return cursor.lastrowid
 
-        cursor = await self.conn.execute(
-            """
-            INSERT INTO payout_requests (user_id, amount, status)
-            VALUES (?, ?, 'pending')
-            """,
-            (user_id, amount)
-        )
-        await self.conn.commit()
-        return cursor.lastrowid
+    async def set_payout_message(self, payout_id: int, channel_id: int, message_id: int):
+        """Remember the gamba-payouts message posted for a payout request."""
+        async with self.write_lock:
+            await self.conn.execute(
+                "UPDATE payout_requests SET channel_id = ?, message_id = ? WHERE id = ?",
+                (channel_id, message_id, payout_id)
+            )
+            await self.conn.commit()
 
 
     async def complete_payout(
@@ -335,46 +698,154 @@ class Database:
         notes: str | None = None
     ):
         """Mark payout as paid and deduct gold."""
-        cursor = await self.conn.execute(
-            """
-            SELECT user_id, amount, status
-            FROM payout_requests
-            WHERE id = ?
-            """,
-            (payout_id,)
-        )
-        row = await cursor.fetchone()
-
-        if not row:
-            raise ValueError("Payout request not found")
-
-        user_id, amount, status = row
-
-        if status != "pending":
-            raise ValueError("Payout already processed")
-
-        # Deduct gold
-        await self.add_ledger_entry(
-            user_id=user_id,
-            amount=-amount,
-            reason="payout",
-            reference_id=f"payout:{payout_id}",
-            officer_id=officer_id
-        )
-
-        # Update payout status
-        await self.conn.execute(
-            """
-            UPDATE payout_requests
-            SET status = 'paid',
-                processed_at = CURRENT_TIMESTAMP,
-                officer_id = ?,
-                notes = ?
-            WHERE id = ?
-            """,
-            (officer_id, notes, payout_id)
-        )
-        await self.conn.commit()
+        async with self.write_lock:
+            cursor = await self.conn.execute(
+                """
+                SELECT user_id, amount, status
+                FROM payout_requests
+                WHERE id = ?
+                """,
+                (payout_id,)
+            )
+            row = await cursor.fetchone()
+
+            if not row:
+                raise ValueError("Payout request not found")
+
+            user_id, amount, status = row
+
+            if status != "pending":
+                raise ValueError("Payout already processed")
+
+            try:
+                # Deduct gold
+                await self.add_ledger_entry(
+                    user_id=user_id,
+                    amount=-amount,
+                    reason="payout",
+                    reference_id=f"payout:{payout_id}",
+                    officer_id=officer_id,
+                    commit=False
+                )
+
+                # Update payout status
+                await self.conn.execute(
+                    """
+                    UPDATE payout_requests
+                    SET status = 'paid',
+                        processed_at = CURRENT_TIMESTAMP,
+                        officer_id = ?,
+                        notes = ?
+                    WHERE id = ?
+                    """,
+                    (officer_id, notes, payout_id)
+                )
+                await self.conn.commit()
+            except Exception:
+                await self.conn.rollback()
+                raise
+
+    async def get_pending_payouts(
+        self,
+        limit: int = 10,
+        after: tuple | None = None
+    ):
+        """
+        Return up to `limit` pending payout requests, oldest first.
+        `after` is the (requested_at, id) key of the last row on the previous page.
+        """
+        if after is None:
+            cursor = await self.conn.execute(
+                """
+                SELECT id, user_id, amount, requested_at, character, server, channel_id, message_id
+                FROM payout_requests
+                WHERE status = 'pending'
+                ORDER BY requested_at, id
+                LIMIT ?
+                """,
+                (limit,)
+            )
+        else:
+            cursor = await self.conn.execute(
+                """
+                SELECT id, user_id, amount, requested_at, character, server, channel_id, message_id
+                FROM payout_requests
+                WHERE status = 'pending'
+                  AND (requested_at > ? OR (requested_at = ? AND id > ?))
+                ORDER BY requested_at, id
+                LIMIT ?
+                """,
+                (after[0], after[0], after[1], limit)
+            )
+        rows = await cursor.fetchall()
+        return [
+            {
+                'id': row[0], 'user_id': row[1], 'amount': row[2], 'requested_at': row[3],
+                'character': row[4], 'server': row[5], 'channel_id': row[6], 'message_id': row[7]
+            }
+            for row in rows
+        ]
+
+    async def complete_payouts(
+        self,
+        payout_ids: list[int],
+        officer_id: int,
+        notes: str | None = None
+    ):
+        """
+        Mark several pending payouts as paid and deduct gold in one transaction.
+        Payouts that are missing or already processed are skipped.
+        Returns the payouts actually paid as
+        [{'id', 'user_id', 'amount', 'character', 'server', 'channel_id', 'message_id'}].
+        """
+        if not payout_ids:
+            return []
+
+        async with self.write_lock:
+            placeholders = ",".join("?" for _ in payout_ids)
+            cursor = await self.conn.execute(
+                f"""
+                SELECT id, user_id, amount, character, server, channel_id, message_id
+                FROM payout_requests
+                WHERE status = 'pending' AND id IN ({placeholders})
+                """,
+                tuple(payout_ids)
+            )
+            rows = await cursor.fetchall()
+            if not rows:
+                return []
+
+            try:
+                await self.conn.executemany(
+                    """
+                    INSERT INTO gold_ledger (user_id, amount, reason, reference_id, officer_id)
+                    VALUES (?, ?, 'payout', ?, ?)
+                    """,
+                    [(row[1], -row[2], f"payout:{row[0]}", officer_id) for row in rows]
+                )
+                await self.conn.executemany(
+                    """
+                    UPDATE payout_requests
+                    SET status = 'paid',
+                        processed_at = CURRENT_TIMESTAMP,
+                        officer_id = ?,
+                        notes = ?
+                    WHERE id = ? AND status = 'pending'
+                    """,
+                    [(officer_id, notes, row[0]) for row in rows]
+                )
+                await self.conn.commit()
+            except Exception:
+                await self.conn.rollback()
+                raise
+
+        return [
+            {
+                'id': row[0], 'user_id': row[1], 'amount': row[2], 'character': row[3],
+                'server': row[4], 'channel_id': row[5], 'message_id': row[6]
+            }
+            for row in rows
+        ]
 
     async def get_pending_payout_sum(self, user_id: int):
         """Return the sum of all pending payout requests for a user."""
@@ -409,6 +880,32 @@ class Database:
         return row[0] or 0
 
 
+    async def get_ledger_totals_since(self, last_id: int):
+        """
+        Return (max_id, {reason: (sum_amount, entry_count)}) for ledger rows with id > last_id.
+        Used to roll the cached economy snapshot forward without rescanning the ledger.
+        """
+        cursor = await self.conn.execute(
+            """
+            SELECT reason, COALESCE(SUM(amount), 0), COUNT(*), MAX(id)
+            FROM gold_ledger
+            WHERE id > ?
+            GROUP BY reason
+            """,
+            (last_id,)
+        )
+        rows = await cursor.fetchall()
+        max_id = max((row[3] for row in rows), default=last_id)
+        return max_id, {row[0]: (row[1], row[2]) for row in rows}
+
+    async def get_lottery_guild_cut_total(self) -> int:
+        """
+        Return the guild cut of every drawn lottery.
+        Summed in full: tiers are drawn out of id order, so an id watermark would skip draws.
+        """
+        cursor = await self.conn.execute("SELECT COALESCE(SUM(guild_cut), 0) FROM lottery_winners")
+        row = await cursor.fetchone()
+        return row[0] or 0
 
 
     # ----------------------------
@@ -427,64 +924,136 @@ class Database:
         return count[0] if count else 0
 
 
-    async def get_active_lottery(self):
-        """Return the active lottery row as a dictionary, or None if none exists."""
+    async def get_lottery_ticket_counts(self, lottery_id: int) -> dict:
+        """Return {user_id: ticket_count} for a lottery."""
         cursor = await self.conn.execute(
-            "SELECT id, lottery_number, start_time, end_time, ticket_price, guild_cut_percent, message_id, status FROM lotteries WHERE status = 'active' ORDER BY start_time DESC LIMIT 1"
+            "SELECT user_id, COUNT(*) FROM lottery_tickets WHERE lottery_id = ? GROUP BY user_id",
+            (lottery_id,)
         )
-        row = await cursor.fetchone()
-        if not row:
-            return None
-        return {
-            'id': row[0],
-            'lottery_number': row[1],
-            'start_time': row[2],
-            'end_time': row[3],
-            'ticket_price': row[4],
-            'guild_cut_percent': row[5],
-            'message_id': row[6],
-            'status': row[7]
-        }
+        return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+    async def get_active_lotteries(self):
+        """Return every active lottery row as a dictionary, oldest first."""
+        cursor = await self.conn.execute(
+            """
+            SELECT id, lottery_number, start_time, end_time, ticket_price, guild_cut_percent,
+                   message_id, status, tier, max_tickets
+            FROM lotteries
+            WHERE status = 'active'
+            ORDER BY start_time
+            """
+        )
+        rows = await cursor.fetchall()
+        return [
+            {
+                'id': row[0],
+                'lottery_number': row[1],
+                'start_time': row[2],
+                'end_time': row[3],
+                'ticket_price': row[4],
+                'guild_cut_percent': row[5],
+                'message_id': row[6],
+                'status': row[7],
+                'tier': row[8],
+                'max_tickets': row[9]
+            }
+            for row in rows
+        ]
 
 
 
     async def create_lottery(self, start_time: datetime.datetime, end_time: datetime.datetime,
-                            ticket_price: int = 5000, guild_cut_percent: int = 20):
+                            ticket_price: int = 5000, guild_cut_percent: int = 20,
+                            tier: str = "standard", max_tickets: int = 20):
         """Create a new lottery and return its ID."""
-        # Determine next lottery number
-        cursor = await self.conn.execute("SELECT MAX(lottery_number) FROM lotteries")
-        last_number = await cursor.fetchone()
-        lottery_number = (last_number[0] or 0) + 1
+        async with self.write_lock:
+            # Determine next lottery number
+            cursor = await self.conn.execute("SELECT MAX(lottery_number) FROM lotteries")
+            last_number = await cursor.fetchone()
+            lottery_number = (last_number[0] or 0) + 1
+
+            cursor = await self.conn.execute("""
+                INSERT INTO lotteries (lottery_number, start_time, end_time, ticket_price, guild_cut_percent, status, tier, max_tickets)
+                VALUES (?, ?, ?, ?, ?, 'active', ?, ?)
+            """, (lottery_number, start_time, end_time, ticket_price, guild_cut_percent, tier, max_tickets))
+            await self.conn.commit()
+            return cursor.lastrowid
 
-        cursor = await self.conn.execute("""
-            INSERT INTO lotteries (lottery_number, start_time, end_time, ticket_price, guild_cut_percent, status)
-            VALUES (?, ?, ?, ?, ?, 'active')
-        """, (lottery_number, start_time, end_time, ticket_price, guild_cut_percent))
-        await self.conn.commit()
-        return cursor.lastrowid
 
 
+    async def set_lottery_message_id(self, lottery_id: int, message_id: int):
+        """Store the announcement message id for a lottery."""
+        async with self.write_lock:
+            await self.conn.execute(
+                "UPDATE lotteries SET message_id = ? WHERE id = ?",
+                (message_id, lottery_id)
+            )
+            await self.conn.commit()
 
-    async def buy_lottery_tickets(self, user_id: int, lottery_id: int, amount: int):
-        """Buy a number of tickets for a lottery."""
-        # Count existing tickets
-        cursor = await self.conn.execute(
-            "SELECT COUNT(*) FROM lottery_tickets WHERE lottery_id = ? AND user_id = ?",
-            (lottery_id, user_id)
-        )
-        count = await cursor.fetchone()
-        existing_tickets = count[0] if count else 0
 
-        if existing_tickets + amount > 20:
-            raise ValueError("Cannot buy more than 20 tickets per user per lottery.")
 
-        purchased_at = datetime.datetime.now(timezone.utc)
-        for _ in range(amount):
-            await self.conn.execute(
-                "INSERT INTO lottery_tickets (lottery_id, user_id, purchased_at) VALUES (?, ?, ?)",
-                (lottery_id, user_id, purchased_at)
+    async def purchase_tickets(
+        self,
+        user_id: int,
+        lottery_id: int,
+        amount: int,
+        ticket_price: int,
+        max_tickets: int = 20,
+        existing_tickets: int | None = None
+    ) -> int:
+        """
+        Buy lottery tickets and debit their cost in a single transaction.
+        Validates the lottery is active, the per-user ticket cap and the balance.
+        Callers that track per-user counts in memory pass existing_tickets to
+        skip counting lottery_tickets.
+        Returns the user's new balance.
+        """
+        if amount <= 0:
+            raise ValueError("Ticket amount must be positive")
+
+        total_cost = amount * ticket_price
+
+        async with self.write_lock:
+            cursor = await self.conn.execute(
+                """
+                SELECT
+                    (SELECT status FROM lotteries WHERE id = ?),
+                    CASE WHEN ? THEN (SELECT COUNT(*) FROM lottery_tickets WHERE lottery_id = ? AND user_id = ?) END,
+                    (SELECT COALESCE(SUM(amount), 0) FROM gold_ledger WHERE user_id = ?)
+                """,
+                (lottery_id, existing_tickets is None, lottery_id, user_id, user_id)
             )
-        await self.conn.commit()
+            status, counted_tickets, balance = await cursor.fetchone()
+            if existing_tickets is None:
+                existing_tickets = counted_tickets
+
+            if status != 'active':
+                raise ValueError("This lottery is no longer active.")
+            if existing_tickets + amount > max_tickets:
+                raise ValueError(f"Cannot buy more than {max_tickets} tickets per user per lottery.")
+            if balance < total_cost:
+                raise ValueError("You do not have enough gold to buy that many tickets.")
+
+            purchased_at = datetime.datetime.now(timezone.utc)
+            try:
+                await self.conn.executemany(
+                    "INSERT INTO lottery_tickets (lottery_id, user_id, purchased_at) VALUES (?, ?, ?)",
+                    [(lottery_id, user_id, purchased_at)] * amount
+                )
+                await self.add_ledger_entry(
+                    user_id=user_id,
+                    amount=-total_cost,
+                    reason="lottery_ticket",
+                    reference_id=f"lottery:{lottery_id}",
+                    commit=False
+                )
+                await self.conn.commit()
+            except Exception:
+                await self.conn.rollback()
+                raise
+
+        return balance - total_cost
 
 
 
@@ -501,6 +1070,15 @@ class Database:
 
     async def close_lottery(self, lottery_id: int):
         """Close an active lottery, draw a winner, and return payout details."""
+        async with self.write_lock:
+            try:
+                return await self._close_lottery(lottery_id)
+            except Exception:
+                # Don't leave a half-drawn lottery for the next writer's commit
+                await self.conn.rollback()
+                raise
+
+    async def _close_lottery(self, lottery_id: int):
         # Get tickets
         cursor = await self.conn.execute(
             "SELECT id, user_id FROM lottery_tickets WHERE lottery_id = ?",
@@ -541,7 +1119,8 @@ class Database:
             user_id=winner_user_id,
             amount=payout,
             reason="lottery_win",
-            reference_id=f"lottery:{lottery_id}"
+            reference_id=f"lottery:{lottery_id}",
+            commit=False
         )
 
         # Mark lottery as completed
@@ -569,4 +1148,18 @@ class Database:
             ORDER BY l.start_time DESC
             LIMIT ?
         """, (limit,))
-        return await cursor.fetchall()
\ No newline at end of file
+        return await cursor.fetchall()
+
+
+
+    async def get_lottery_pot_history(self, tier: str, limit: int = 10):
+        """Return (lottery_number, end_time, total_pot, payout, ticket_count) for the last N drawn lotteries of a tier, newest first."""
+        cursor = await self.conn.execute("""
+            SELECT l.lottery_number, l.end_time, w.total_pot, w.payout, w.total_pot / l.ticket_price
+            FROM lottery_winners w
+            JOIN lotteries l ON l.id = w.lottery_id
+            WHERE l.tier = ?
+            ORDER BY w.lottery_id DESC
+            LIMIT ?
+        """, (tier, limit))
+        return await cursor.fetchall()
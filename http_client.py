@@ -0,0 +1,114 @@
+import aiohttp
+import asyncio
+import random
+
+
+# One pooled, keep-alive session per upstream API, each with its own limits.
+UPSTREAMS = {
+    "raiderio": {
+        "limit_per_host": 8,
+        "timeout": 15,
+        "retries": 3,
+    },
+    "wowaudit": {
+        "limit_per_host": 4,
+        "timeout": 30,
+        "retries": 3,
+    },
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 1  # seconds, doubled per attempt
+BACKOFF_CAP = 60
+KEEPALIVE_TIMEOUT = 60
+
+
+class HttpResponse:
+    """Fully read response, so callers never have to manage the connection."""
+
+    def __init__(self, status: int, headers, text: str, data):
+        self.status = status
+        self.headers = headers
+        self.text = text
+        self.data = data  # parsed JSON body, or None
+
+    def json(self):
+        return self.data
+
+
+class HttpClients:
+    def __init__(self):
+        self.sessions = {}
+
+    def session(self, upstream: str) -> aiohttp.ClientSession:
+        """Return the session for an upstream, creating it on first use (inside the running loop)."""
+        session = self.sessions.get(upstream)
+        if session is None or session.closed:
+            config = UPSTREAMS[upstream]
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=config["limit_per_host"],
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(total=config["timeout"])
+            )
+            self.sessions[upstream] = session
+        return session
+
+    async def request(
+        self,
+        upstream: str,
+        method: str,
+        url: str,
+        *,
+        retries: int | None = None,
+        on_retry=None,
+        **kwargs
+    ) -> HttpResponse:
+        """
+        Send a request through the upstream's pooled session.
+        429/5xx responses and connection errors are retried with exponential backoff
+        and full jitter (Retry-After is honoured). Other statuses are returned as-is;
+        the last response is returned once retries run out, and connection errors
+        are re-raised.
+        """
+        if retries is None:
+            retries = UPSTREAMS[upstream]["retries"]
+
+        session = self.session(upstream)
+        for attempt in range(retries + 1):
+            retry_after = None
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    text = await response.text()
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = None
+                    result = HttpResponse(response.status, response.headers, text, data)
+                if result.status not in RETRY_STATUSES or attempt == retries:
+                    return result
+                retry_after = result.headers.get("Retry-After")
+                reason = f"status {result.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == retries:
+                    raise
+                reason = str(e) or type(e).__name__
+
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            print(f"[HTTP] {method} {url} failed ({reason}), retrying in {delay:.1f}s")
+            if on_retry:
+                on_retry()
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions = {}
+
+
+clients = HttpClients()
+request = clients.request
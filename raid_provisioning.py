@@ -0,0 +1,281 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+import discord
+
+import http_client
+
+
+RAIDER_IO_STATIC_DATA_URL = "https://raider.io/api/v1/raiding/static-data"
+
+
+# Thread creation shares one route bucket per guild, keep well under it
+THREAD_CREATE_RATE = float(os.getenv("THREAD_CREATE_RATE", "1"))  # threads per second, sustained
+THREAD_CREATE_BURST = int(os.getenv("THREAD_CREATE_BURST", "4"))
+THREAD_CREATE_RETRIES = 3
+
+
+class TokenBucket:
+    """
+    Async token bucket. pause() empties it and blocks every caller until the
+    given time has passed, used when Discord answers 429 with a reset time.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()  # waiters are served in order
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self.tokens = 0
+        self.updated = time.monotonic()
+        self.blocked_until = max(self.blocked_until, self.updated + seconds)
+
+
+thread_limiter = TokenBucket(THREAD_CREATE_RATE, THREAD_CREATE_BURST)
+
+
+async def fetch_static_data(db, expansion_id: int):
+    """
+    Fetch Raider.io raid static data for an expansion with a conditional request
+    against the stored ETag/Last-Modified.
+    Returns {"raids", "content_hash", "changed"} where changed means the payload
+    differs from the one last reconciled, or None if no data is available.
+    """
+    cached = await db.get_raid_static_data(expansion_id)
+    request_headers = {}
+    if cached:
+        if cached["etag"]:
+            request_headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            request_headers["If-Modified-Since"] = cached["last_modified"]
+
+    response = await http_client.request(
+        "raiderio", "GET", RAIDER_IO_STATIC_DATA_URL,
+        params={"expansion_id": expansion_id}, headers=request_headers
+    )
+    print(f"Raider.io API Response: {response.status}")  # Debugging
+
+    if response.status == 304 and cached:
+        raid_data = json.loads(cached["data"])
+        content_hash = cached["content_hash"]
+    elif response.status == 200 and response.data is not None:
+        raid_data = response.data
+        payload = json.dumps(raid_data, sort_keys=True)
+        content_hash = hashlib.sha256(payload.encode()).hexdigest()
+        await db.set_raid_static_data(
+            expansion_id,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            payload,
+            content_hash
+        )
+    else:
+        return None
+
+    return {
+        "raids": raid_data.get("raids", []),
+        "content_hash": content_hash,
+        "changed": not cached or cached["reconciled_hash"] != content_hash,
+    }
+
+
+def retry_after(error: discord.HTTPException) -> float:
+    """Seconds to wait according to the 429 response's rate-limit headers."""
+    headers = getattr(error.response, "headers", None) or {}
+    for header in ("Retry-After", "X-RateLimit-Reset-After"):
+        try:
+            return float(headers[header])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return 5.0
+
+
+async def create_boss_thread(channel: discord.TextChannel, boss_name: str):
+    """Create one boss thread with a link back to its raid channel; returns the thread."""
+    for attempt in range(THREAD_CREATE_RETRIES + 1):
+        await thread_limiter.acquire()
+        try:
+            thread = await channel.create_thread(
+                name=boss_name,
+                type=discord.ChannelType.public_thread
+            )
+            break
+        except discord.HTTPException as e:
+            if e.status != 429 or attempt == THREAD_CREATE_RETRIES:
+                raise
+            delay = retry_after(e)
+            print(f"[Raids] Rate limited creating thread '{boss_name}', pausing {delay:.1f}s")
+            thread_limiter.pause(delay)
+
+    await thread.send(f"# [Back to {channel.name}](https://discord.com/channels/{channel.guild.id}/{channel.id})")
+    return thread
+
+
+def channel_name(raid_name: str) -> str:
+    """The name Discord gives a text channel created as raid_name."""
+    return raid_name.lower().replace(" ", "-").replace("'", "").replace(":", "")
+
+
+async def snapshot(raid_category: discord.CategoryChannel, archive_category: discord.CategoryChannel | None) -> dict:
+    """
+    Current state of the raid channels: {channel_name: {"channel", "archived", "threads"}}.
+    threads maps thread name -> id and includes archived threads; channels in
+    the ARCHIVED category are left alone so their threads aren't fetched.
+    """
+    channels = {}
+    if archive_category:
+        for channel in archive_category.text_channels:
+            channels[channel.name] = {"channel": channel, "archived": True, "threads": {}}
+
+    for channel in raid_category.text_channels:
+        threads = {thread.name: thread.id for thread in channel.threads}
+        async for thread in channel.archived_threads(limit=None):
+            threads.setdefault(thread.name, thread.id)
+        channels[channel.name] = {"channel": channel, "archived": False, "threads": threads}
+    return channels
+
+
+def plan_raids(raids: list, current: dict) -> list:
+    """
+    Compare the static data against a snapshot and return the actions needed:
+    "create_channel" for missing raids, "create_threads" for raid channels
+    missing boss threads. Up-to-date and archived raids produce no action.
+    """
+    plan = []
+    for raid in raids:
+        raid_name = raid.get("name")
+        if not raid_name:
+            continue
+        bosses = [boss.get("name") for boss in raid.get("encounters", []) if boss.get("name")]
+
+        existing = current.get(channel_name(raid_name))
+        if existing is None:
+            plan.append({"action": "create_channel", "raid": raid_name, "bosses": bosses})
+        elif not existing["archived"]:
+            missing = [boss for boss in bosses if boss not in existing["threads"]]
+            if missing:
+                plan.append({
+                    "action": "create_threads",
+                    "raid": raid_name,
+                    "channel": existing["channel"],
+                    "bosses": bosses,
+                    "missing": missing,
+                    "threads": existing["threads"],
+                })
+    return plan
+
+
+def format_plan(plan: list) -> str:
+    """Human readable diff of a plan."""
+    if not plan:
+        return "Raid channels are up to date."
+    lines = []
+    for step in plan:
+        if step["action"] == "create_channel":
+            lines.append(f"+ #{channel_name(step['raid'])} with {len(step['bosses'])} boss threads")
+        else:
+            lines.append(f"~ #{step['channel'].name}: add {', '.join(step['missing'])}")
+    return "\n".join(lines)
+
+
+async def create_threads(channel: discord.TextChannel, boss_names: list):
+    """Create boss threads concurrently; returns ({boss_name: thread_id}, [failed boss_name])."""
+    results = await asyncio.gather(
+        *[create_boss_thread(channel, boss_name) for boss_name in boss_names],
+        return_exceptions=True
+    )
+
+    created = {}
+    failed = []
+    for boss_name, result in zip(boss_names, results):
+        if isinstance(result, Exception):
+            print(f"Failed to create thread for boss {boss_name}: {result}")
+            failed.append(boss_name)
+        else:
+            created[boss_name] = result.id
+            print(f"Created thread for boss: {boss_name}")  # Debugging
+    return created, failed
+
+
+def links_message(guild: discord.Guild, bosses: list, threads: dict) -> str:
+    return "\n".join(
+        f"# [{boss_name}](https://discord.com/channels/{guild.id}/{threads[boss_name]}) \n"
+        for boss_name in bosses if boss_name in threads
+    )
+
+
+async def apply_step(guild: discord.Guild, raid_category: discord.CategoryChannel, step: dict) -> dict:
+    if step["action"] == "create_channel":
+        channel = await guild.create_text_channel(step["raid"], category=raid_category)
+        print(f"Created new channel: {channel.name}")  # Debugging
+        threads, failed = await create_threads(channel, step["bosses"])
+        links = None
+    else:
+        channel = step["channel"]
+        created, failed = await create_threads(channel, step["missing"])
+        threads = dict(step["threads"], **created)
+        # The links message is the bot's own message pointing at the threads
+        links = None
+        async for message in channel.history(limit=50):
+            if message.author == guild.me and "discord.com/channels" in message.content:
+                links = message
+                break
+
+    # Clear the "started a thread" system messages in one bulk delete before posting the index
+    removed = await channel.purge(
+        limit=100,
+        check=lambda message: message.type == discord.MessageType.thread_created,
+        bulk=True
+    )
+    print(f"Removed {len(removed)} thread notices from #{channel.name}")  # Debugging
+
+    content = links_message(guild, step["bosses"], threads)
+    if content and links:
+        await links.edit(content=content)
+    elif content:
+        await channel.send(content)
+    print(f"Sent links for raid '{step['raid']}'")  # Debugging
+
+    return {"raid": step["raid"], "channel": channel, "threads": threads, "failed": failed, "removed": len(removed)}
+
+
+async def apply_plan(guild: discord.Guild, raid_category: discord.CategoryChannel, plan: list) -> list:
+    """
+    Apply every step of a plan in one pass, steps running concurrently under
+    thread_limiter. Returns one {"raid", "channel", "threads", "failed", "removed"} per step,
+    removed being the number of thread notices cleaned out of the channel.
+    """
+    results = await asyncio.gather(
+        *[apply_step(guild, raid_category, step) for step in plan],
+        return_exceptions=True
+    )
+
+    applied = []
+    for step, result in zip(plan, results):
+        if isinstance(result, Exception):
+            print(f"Failed to apply {step['action']} for raid {step['raid']}: {result}")
+            result = {"raid": step["raid"], "channel": None, "threads": {}, "failed": step.get("missing", step["bosses"]), "removed": 0}
+        applied.append(result)
+    return applied
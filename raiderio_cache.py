@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+import http_client
+
+
+RAIDERIO_PROFILE_URL = 'https://raider.io/api/v1/characters/profile'
+
+PROFILE_TTL_SECONDS = int(os.getenv("RAIDERIO_PROFILE_TTL_SECONDS", "900"))  # served as-is
+PROFILE_MAX_STALE_SECONDS = int(os.getenv("RAIDERIO_PROFILE_MAX_STALE_SECONDS", "86400"))  # served while refreshing
+PROFILE_CACHE_SIZE = int(os.getenv("RAIDERIO_PROFILE_CACHE_SIZE", "500"))
+
+
+def realm_slug(realm: str) -> str:
+    return realm.strip().replace(' ', '-').replace("'", '').lower()
+
+
+class ProfileCache:
+    """
+    Raider.io character profiles keyed by (region, realm, name, fields).
+    In-memory LRU in front of the raiderio_profiles table. Fresh entries are
+    returned directly, stale ones are returned immediately while a background
+    refresh runs, and concurrent lookups for the same key share one request.
+    """
+
+    def __init__(self, database):
+        self.db = database
+        self.entries = OrderedDict()  # cache_key -> (data, fetched_at)
+        self.inflight = {}  # cache_key -> asyncio.Task
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, realm: str, name: str, fields: str, region: str = 'us'):
+        """Return the profile dict, or None if Raider.io doesn't know the character."""
+        params = {
+            'region': region,
+            'realm': realm_slug(realm),
+            'name': name.strip(),
+            'fields': fields
+        }
+        cache_key = f"{region}:{params['realm']}:{params['name'].lower()}:{fields}"
+
+        entry = self.entries.get(cache_key)
+        if entry is None:
+            entry = await self._load(cache_key)
+
+        if entry is not None:
+            data, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < PROFILE_TTL_SECONDS:
+                self.hits += 1
+                self.entries.move_to_end(cache_key)
+                return data
+            if age < PROFILE_MAX_STALE_SECONDS:
+                self.stale_hits += 1
+                self.entries.move_to_end(cache_key)
+                self._fetch(cache_key, params)  # refresh in the background
+                return data
+
+        self.misses += 1
+        return await asyncio.shield(self._fetch(cache_key, params))
+
+    def _fetch(self, cache_key: str, params: dict) -> asyncio.Task:
+        task = self.inflight.get(cache_key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        task = asyncio.create_task(self._refresh(cache_key, params))
+        self.inflight[cache_key] = task
+        task.add_done_callback(lambda _: self.inflight.pop(cache_key, None))
+        return task
+
+    async def _refresh(self, cache_key: str, params: dict):
+        try:
+            response = await http_client.request("raiderio", "GET", RAIDERIO_PROFILE_URL, params=params)
+        except Exception as e:
+            print(f"[Raider.io] Profile fetch failed for {cache_key}: {e}")
+            return None
+
+        if response.status != 200 or response.data is None:
+            return None
+
+        fetched_at = time.time()
+        self._remember(cache_key, response.data, fetched_at)
+        await self.db.set_raiderio_profile(cache_key, json.dumps(response.data), fetched_at)
+        return response.data
+
+    async def _load(self, cache_key: str):
+        row = await self.db.get_raiderio_profile(cache_key)
+        if row is None:
+            return None
+        entry = (json.loads(row[0]), row[1])
+        self._remember(cache_key, *entry)
+        return entry
+
+    def _remember(self, cache_key: str, data, fetched_at: float):
+        self.entries[cache_key] = (data, fetched_at)
+        self.entries.move_to_end(cache_key)
+        while len(self.entries) > PROFILE_CACHE_SIZE:
+            self.entries.popitem(last=False)
+
+    async def prune(self) -> int:
+        """Drop persisted profiles too old to ever be served again."""
+        return await self.db.prune_raiderio_profiles(time.time() - PROFILE_MAX_STALE_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self.entries),
+        }
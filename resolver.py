@@ -0,0 +1,115 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+
+NOT_FOUND = 0  # cached "no such name" marker, cleared by the same create/update events
+
+
+class NameResolver:
+    """
+    Per-guild cache mapping channel/role names to IDs.
+    Lookups go through guild.get_channel/get_role (dict lookups) instead of
+    scanning guild.text_channels/guild.roles on every call.
+    """
+
+    def __init__(self):
+        self.cache = {}  # (guild_id, kind, name) -> id
+        self.hits = 0
+        self.misses = 0
+
+    def _resolve(self, guild: discord.Guild, kind: str, name: str, collection, getter, obj_type):
+        key = (guild.id, kind, name)
+        cached_id = self.cache.get(key)
+
+        if cached_id == NOT_FOUND:
+            self.hits += 1
+            return None
+        if cached_id is not None:
+            obj = getter(cached_id)
+            if isinstance(obj, obj_type) and obj.name == name:
+                self.hits += 1
+                return obj
+            # Stale entry (renamed/deleted without us seeing the event)
+            del self.cache[key]
+
+        self.misses += 1
+        obj = discord.utils.get(collection(), name=name)
+        self.cache[key] = obj.id if obj else NOT_FOUND
+        return obj
+
+    def text_channel(self, guild: discord.Guild, name: str):
+        return self._resolve(guild, "text_channel", name, lambda: guild.text_channels, guild.get_channel, discord.TextChannel)
+
+    def category(self, guild: discord.Guild, name: str):
+        return self._resolve(guild, "category", name, lambda: guild.categories, guild.get_channel, discord.CategoryChannel)
+
+    def channel(self, guild: discord.Guild, name: str):
+        return self._resolve(guild, "channel", name, lambda: guild.channels, guild.get_channel, discord.abc.GuildChannel)
+
+    def role(self, guild: discord.Guild, name: str):
+        return self._resolve(guild, "role", name, lambda: guild.roles, guild.get_role, discord.Role)
+
+    def invalidate(self, guild_id: int, kinds: tuple):
+        """Drop every cached entry of the given kinds for a guild."""
+        for key in [key for key in self.cache if key[0] == guild_id and key[1] in kinds]:
+            del self.cache[key]
+
+    def invalidate_channels(self, guild_id: int):
+        self.invalidate(guild_id, ("text_channel", "category", "channel"))
+
+    def invalidate_roles(self, guild_id: int):
+        self.invalidate(guild_id, ("role",))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.cache),
+        }
+
+
+class ResolverEvents(commands.Cog):
+    """Keeps the bot's NameResolver in sync with channel and role changes."""
+
+    def __init__(self, bot, resolver: NameResolver):
+        self.bot = bot
+        self.resolver = resolver
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.resolver.invalidate_channels(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.resolver.invalidate_channels(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        if before.name != after.name or type(before) is not type(after):
+            self.resolver.invalidate_channels(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.resolver.invalidate_roles(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.resolver.invalidate_roles(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.name != after.name:
+            self.resolver.invalidate_roles(after.guild.id)
+
+    @app_commands.command(name="resolverstats", description="Show channel/role name cache statistics")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def resolverstats(self, interaction: discord.Interaction):
+        stats = self.resolver.stats()
+        await interaction.response.send_message(
+            f"🔎 Name resolver: **{stats['hit_rate']:.1%}** hit rate "
+            f"({stats['hits']:,} hits / {stats['misses']:,} misses), {stats['entries']} cached entries.",
+            ephemeral=True
+        )